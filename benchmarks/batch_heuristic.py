@@ -0,0 +1,48 @@
+##  Microbenchmark for Graph.calculeaza_h_batch against calculeaza_h called for every state, on the successors of the
+##  root of a synthetic instance (50 persons, 40 routes). Needs NumPy.
+##  Usage: python benchmarks/batch_heuristic.py [number of repetitions]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import multeautobuze
+from lookup_tables import syntheticInput
+
+
+def measure(function, repetitions):
+    """Calls the function repeatedly
+
+    :return: seconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) / repetitions
+
+
+if __name__ == "__main__":
+    if multeautobuze.loadNumpy() is None:
+        print("NumPy nu este instalat")
+        sys.exit(1)
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        inputFile = os.path.join(directory, "sintetic")
+        with open(inputFile, "w") as f:
+            f.write(syntheticInput())
+        gr = multeautobuze.transformInput(inputFile)
+    if isinstance(gr, str):
+        print(gr)
+        sys.exit(1)
+    gr.heuristicCacheSize = 0  # Every value is calculated
+
+    infos = [node.info for node in gr.genereazaSuccesori(gr.startNode)]
+    print(f"{len(infos)} succesori ai radacinii, {len(infos[0].persons)} persoane in fiecare")
+    for heuristic in ["euristica banala", "euristica admisibila 1", "euristica admisibila 2",
+                      "euristica admisibila 3", "euristica admisibila 4", "euristica neadmisibila"]:
+        batch = measure(lambda: gr.calculeaza_h_batch(infos, heuristic), repetitions)
+        single = measure(lambda: [gr.calculeaza_h(info, heuristic) for info in infos], repetitions)
+        print(f"{heuristic}: batch {batch / len(infos) * 1e6:.1f}us, "
+              f"pe rand {single / len(infos) * 1e6:.1f}us per stare")
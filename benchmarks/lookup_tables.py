@@ -0,0 +1,89 @@
+##  Microbenchmark for the person and bus lookups of Information, on a synthetic instance (50 persons, 40 routes)
+##  Usage: python benchmarks/lookup_tables.py [number of repetitions]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import multeautobuze
+
+
+def syntheticInput(nrPersons=50, nrRoutes=40, nrStations=120, seed=233):
+    """Builds an input file in the format read by transformInput
+
+    :param nrPersons: number of persons, each starting in a different station
+    :param nrRoutes: number of bus routes
+    :param nrStations: number of stations
+    :param seed: seed for the random generator, so every run uses the same instance
+    :return: string with the content of the file
+    """
+    generator = random.Random(seed)
+    stations = [f'"Statia {index}"' for index in range(nrStations)]
+    lines = ["08:00 10:00"]
+    for route in range(nrRoutes):
+        routeStations = generator.sample(stations, generator.randint(4, 8))
+        lines.append(f"{100 + route} {generator.randint(1, 5)}lei {generator.randint(10, 20)}min "
+                     f"{generator.randint(2, 6)}min " + ",".join(routeStations))
+    lines.append(f"{nrPersons} oameni")
+    for person in range(nrPersons):
+        destinations = [stations[person]] + generator.sample(stations[nrPersons:], 2)
+        lines.append(f"Om{person} 100lei " + ",".join(destinations))
+    return "\n".join(lines)
+
+
+def scanPerson(info, name):
+    """Linear scan, how Information.getPerson used to find a person"""
+    for index in range(len(info.persons)):
+        if info.persons[index].name == name:
+            return index
+    return None
+
+
+def scanBus(info, nr, leaveTime, type):
+    """Linear scan, how Information.getBus used to find a bus"""
+    for index in range(len(info.buses)):
+        if (info.buses[index].nr, info.buses[index].leaveTime, info.buses[index].type) == (nr, leaveTime, type):
+            return index
+    return None
+
+
+def measure(function, info, arguments, repetitions):
+    """Calls the function for every tuple of arguments, repeatedly
+
+    :return: seconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for argument in arguments:
+            function(info, *argument)
+    return (time.perf_counter() - start) / (repetitions * len(arguments))
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        inputFile = os.path.join(directory, "sintetic")
+        with open(inputFile, "w") as f:
+            f.write(syntheticInput())
+        gr = multeautobuze.transformInput(inputFile)
+    if isinstance(gr, str):
+        print(gr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    successors = gr.genereazaSuccesori(gr.startNode)
+    print(f"genereazaSuccesori pe radacina: {len(successors)} succesori in {time.perf_counter() - start:.3f}s")
+
+    # A state with buses on route
+    info = max(successors, key=lambda node: len(node.info.buses)).info
+    names = [(person.name,) for person in info.persons]
+    busKeys = [(bus.nr, bus.leaveTime, bus.type) for bus in info.buses]
+    print(f"Stare cu {len(info.persons)} persoane si {len(info.buses)} autobuze")
+    for label, function, arguments in [("getPerson", multeautobuze.Information.getPerson, names),
+                                       ("cautare liniara persoana", scanPerson, names),
+                                       ("getBus", multeautobuze.Information.getBus, busKeys),
+                                       ("cautare liniara autobuz", scanBus, busKeys)]:
+        print(f"{label}: {measure(function, info, arguments, repetitions) * 1e9:.0f}ns per apel")
@@ -0,0 +1,42 @@
+##  Memory benchmark: average number of bytes a search node keeps alive
+##  Usage: python benchmarks/memory_per_node.py [input file] [number of expanded nodes]
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import multeautobuze
+
+
+def bytesPerNode(inputFile, nrExpanded):
+    """Expands nodes breadth first, keeping every generated node alive, like the closed list of a_star_optimizat
+
+    :param inputFile: path to the input file
+    :param nrExpanded: number of nodes to expand
+    :return: tuple (number of nodes kept, average bytes per node)
+    """
+    gr = multeautobuze.transformInput(inputFile)
+    if isinstance(gr, str):
+        print(gr)
+        sys.exit(1)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [multeautobuze.Node(gr.startNode.info, None, 0, 0, 0, 0, gr.startTime)]
+    index = 0
+    while index < len(nodes) and index < nrExpanded:
+        nodes.extend(gr.genereazaSuccesori(nodes[index]))
+        index += 1
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(nodes), (after - before) / len(nodes)
+
+
+if __name__ == "__main__":
+    inputFile = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                                                                   "folder_input", "input4")
+    nrExpanded = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    nrNodes, average = bytesPerNode(inputFile, nrExpanded)
+    print(f"Noduri in memorie: {nrNodes}")
+    print(f"Bytes per nod: {average:.0f}")
@@ -0,0 +1,45 @@
+##  Benchmark for the time the command line takes on a trivial input, whose initial state is already final, so the
+##  time is spent on starting Python, importing the module and writing the output file
+##  Usage: python benchmarks/startup.py [number of runs]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "multeautobuze.py")
+
+trivialInput = "\n".join(['08:00 10:00',
+                          '100 5lei 15min 4min "Gandaceni","Ciuperceni"',
+                          '1 oameni',
+                          'Ionel 100lei "Gandaceni"'])
+
+
+def measure(arguments, runs):
+    """Runs Python with the arguments repeatedly
+
+    :param arguments: list of arguments of the interpreter
+    :param runs: number of runs
+    :return: seconds per run
+    """
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable] + arguments, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) / runs
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        inputDirectory = os.path.join(directory, "input")
+        os.mkdir(inputDirectory)
+        with open(os.path.join(inputDirectory, "trivial"), "w") as f:
+            f.write(trivialInput)
+        outputDirectory = os.path.join(directory, "output")
+        python = measure(["-c", "pass"], runs)
+        for label, options in [("fara profilare", []),
+                               ("cu --profile", ["--profile", os.path.join(directory, "out.prof")])]:
+            seconds = measure([script, inputDirectory, outputDirectory, "1", "10"] + options, runs)
+            print(f"{label}: {seconds * 1000:.1f}ms per rulare ({(seconds - python) * 1000:.1f}ms peste pornirea "
+                  f"Python)")
@@ -2,12 +2,58 @@
 ##  Link pentru documentatie si foldere de input/output
 ##  https://github.com/NMDMaria/A_star_KR
 
-import cProfile
-from copy import deepcopy
+import bisect
+from collections import Counter, OrderedDict
+from copy import copy
+import heapq
+import itertools
 import time
 import os
 import sys
-import stopit
+
+# NumPy is optional and only needed for calculeaza_h_batch, it is imported by loadNumpy the first time it is used
+numpy = None
+numpyMissing = False
+
+
+def loadNumpy():
+    """Imports NumPy the first time it is needed, so the runs that don't use it don't wait for the import
+
+    :return: the numpy module or None if it isn't installed
+    """
+    global numpy, numpyMissing
+    if numpy is None and not numpyMissing:
+        try:
+            import numpy as module
+            numpy = module
+        except ImportError:
+            numpyMissing = True
+    return numpy
+
+
+def replaceAttributes(obj, changes):
+    """Makes a shallow copy of the object with some attributes changed
+
+    :param obj: object to copy
+    :param changes: dictionary attribute name -> new value
+    :return: the new object
+    """
+    new = copy(obj)
+    for name, value in changes.items():
+        setattr(new, name, value)
+    return new
+
+
+def stationIndexes(route):
+    """Maps every station in the route to its index (the first one, if the route passes twice through it)
+
+    :param route: list of Int, the station ids
+    :return: dictionary station id -> index in route
+    """
+    indexes = {}
+    for index in range(len(route)):
+        indexes.setdefault(route[index], index)
+    return indexes
 
 
 class Bus:
@@ -16,8 +62,10 @@ class Bus:
     Note:
         Every bus can be identified by an unique tuple (self.nr, self.leaveTime, self.type)
     """
+    __slots__ = ("leaveTime", "travelTime", "route", "stationIndex", "nr", "person", "currentStation", "routeIndex",
+                 "ticketPrice", "type")
 
-    def __init__(self, nr, route, leaveTime, travelTime, ticketPrice, type):
+    def __init__(self, nr, route, leaveTime, travelTime, ticketPrice, type, stationIndex=None):
         """__init__
 
         Note:
@@ -25,16 +73,18 @@ class Bus:
 
         Params:
             :param nr: The number for the bus
-            :param route: a list of String, the stations for the bus
+            :param route: a list of Int, the ids of the stations for the bus
             :param leaveTime: the time the bus left the depot
             :param travelTime: the time it takes the bus to get from one station to another
             :param ticketPrice: the price for the ticket
             :param type: normal for left to right, reverse for right to left
+            :param stationIndex: dictionary station id -> index in route, computed if not provided
 
         """
         self.leaveTime = leaveTime
         self.travelTime = travelTime
         self.route = route
+        self.stationIndex = stationIndex if stationIndex is not None else stationIndexes(route)
         self.nr = nr
         self.person = None  # Name of person on bus
         self.currentStation = self.route[0]
@@ -45,13 +95,10 @@ class Bus:
     def findStation(self, station):
         """Provides acces to the index in the route list
 
-        :param station: a string with the name of the station
+        :param station: the id of the station
         :return: index or None if the station isn't in this route
         """
-        for index in range(len(self.route)):
-            if self.route[index] == station:
-                return index
-        return None
+        return self.stationIndex.get(station)
 
     def move(self, time):
         """ Moves this bus accordingly with the time.
@@ -71,6 +118,27 @@ class Bus:
 
         return False
 
+    def movedAt(self, time):
+        """Same as move, but doesn't modify this bus, so it can be shared in between states
+
+        :param time: time in minutes
+        :return: the moved bus (self if it is already there) or None if the bus doesn't move
+        """
+        if (time - self.leaveTime) % self.travelTime != 0:
+            return None
+        routeIndex = int((time - self.leaveTime) / self.travelTime)
+        if routeIndex == self.routeIndex:
+            return self
+        return self.replace(routeIndex=routeIndex, currentStation=self.route[routeIndex])
+
+    def replace(self, **changes):
+        """Makes a shallow copy of this bus with the attributes provided changed
+
+        :param changes: attribute name -> new value
+        :return: Bus
+        """
+        return replaceAttributes(self, changes)
+
     def __str__(self):
         string = f"Nr: {self.nr} plecat la {self.leaveTime} la locatia {self.currentStation}"
         if self.person is not None:
@@ -90,6 +158,8 @@ class Bus:
 class BusSchema:
     """ Keeps the schema of the bus, but doesn't represent an actual moving bus
     """
+    __slots__ = ("nr", "ticketPrice", "tplec", "travelTime", "route", "reverseRoute", "stationIndex",
+                 "reverseStationIndex")
 
     def __init__(self, nr, ticketPrice, tplec, travelTime, route):
         """ __init__
@@ -98,27 +168,34 @@ class BusSchema:
         :param ticketPrice: the price for the bus
         :param tplec: time in minutes that buses leave the depots
         :param travelTime: time it takes one bus to move in between two stations
-        :param route: list of string with the station names
+        :param route: list of Int with the station ids
         """
         self.nr = nr
         self.ticketPrice = ticketPrice
         self.tplec = tplec
         self.travelTime = travelTime
         self.route = route
+        self.reverseRoute = route[::-1]  # Route of the buses leaving from the last station
 
-        self.busesOnRoute = 0  # Number of buses that left the depots with this number
-        self.nrDisappearedBuses = 0  # Number of buses that finished their route
+        # Station id -> index in route, for both directions
+        self.stationIndex = stationIndexes(self.route)
+        self.reverseStationIndex = stationIndexes(self.reverseRoute)
 
     def findStation(self, station):
         """Provides acces to the index in the route list
 
-        :param station: a string with the name of the station
+        :param station: the id of the station
         :return: index or None if the station isn't in this route
         """
-        for index in range(len(self.route)):
-            if self.route[index] == station:
-                return index
-        return None
+        return self.stationIndex.get(station)
+
+    def replace(self, **changes):
+        """Makes a shallow copy of this schema with the attributes provided changed
+
+        :param changes: attribute name -> new value
+        :return: BusSchema
+        """
+        return replaceAttributes(self, changes)
 
     def __repr__(self):
         return f"{self.nr}, tplec = {self.tplec}, price = {self.ticketPrice}, travelTime = {self.travelTime}, route = {self.route}\n"
@@ -126,13 +203,15 @@ class BusSchema:
 
 class Person:
     """Models a person"""
+    __slots__ = ("name", "budget", "destinations", "nr_destinations", "location", "waitingTime", "travelTime", "bus",
+                 "visited", "status", "lastAction", "banned")
 
     def __init__(self, name, budget, destinations):
         """__init__
 
         :param name: indentifier string for person
         :param budget: float/int of the money this person has
-        :param destinations: list of string with stations they need to visit
+        :param destinations: list of Int with the ids of the stations they need to visit
         """
         self.name = name
         self.budget = budget
@@ -164,6 +243,17 @@ class Person:
         self.location = newLocation
         return True
 
+    def replace(self, **changes):
+        """Makes a shallow copy of this person with the attributes provided changed
+
+        Note:
+            banned is shared with the copy, so it has to be replaced, not updated
+
+        :param changes: attribute name -> new value
+        :return: Person
+        """
+        return replaceAttributes(self, changes)
+
     def __str__(self):
         string = f"{self.name}"
         string += f" Stare: {self.status}"
@@ -191,30 +281,102 @@ class Information:
         of the person and bus that triggered this new state
 
     """
+    __slots__ = ("action", "busSchemas", "person", "bus", "persons", "time", "buses", "departedUntil", "stations",
+                 "waiting", "personIndexes", "busIndexes", "busSchemaIndexes")
 
-    def __init__(self, busSchemas, persons, buses, time, action=None, nextTimes=[], person=None, bus=None):
+    def __init__(self, busSchemas, persons, buses, time, action=None, person=None, bus=None, departedUntil=-1,
+                 stations=()):
         """__init__
 
-        :param busSchemas: list of BusSchema
+        :param busSchemas: list of BusSchema, sorted by ticket price, travel time and tplec
         :param persons: list of Person, persons that didn't finish their destinations
         :param buses: list of Bus, buses that are now on route
         :param time: the time in minutes that this state occured
         :param action: either "up" for boarding a bus, "down" or "finalizing" for unboarding the bus
-        :param nextTimes: list of Int, keeps the times an action can take place
         :param person: person that triggered the change of state
         :param bus: bus that triggered the change of state
+        :param departedUntil: the last time the buses leaving the depots were added in buses, -1 if none were added
+        :param stations: list of String, the name of every station, indexed by the station id
         """
         self.action = action
-        self.busSchemas = sorted(busSchemas, key=lambda x: (x.ticketPrice, x.travelTime, x.tplec))
+        self.busSchemas = busSchemas  # Sorted once when the input is read, shared by all the states
         self.person = person  # Person that triggered the new state
         self.bus = bus  # The bus the person got up/down from
         self.persons = persons  # The list of all the current persons
         self.time = time  # The time the action took place
         self.buses = buses  # All the buses on the route at the moment
-        self.nextTimes = nextTimes  # List of times we are certain an action could take place
+        self.departedUntil = departedUntil
+        self.stations = stations  # Shared by all the states
+
+        # Lookup tables, built the first time they're needed (most states are never expanded)
+        self.personIndexes = None
+        self.busIndexes = None
+        self.busSchemaIndexes = None
+        self.waiting = None
+
+    def buildLookupTables(self):
+        """Builds the tables used to find persons, buses and bus schemas without searching the lists
+
+        Note:
+            The tables are kept up to date by addBus and removeBus
+        """
+        self.personIndexes = {self.persons[index].name: index for index in range(len(self.persons))}
+        self.busIndexes = {(self.buses[index].nr, self.buses[index].leaveTime, self.buses[index].type): index
+                           for index in range(len(self.buses))}
+        self.busSchemaIndexes = {}
+        for index in range(len(self.busSchemas)):
+            self.busSchemaIndexes.setdefault(self.busSchemas[index].nr, index)
+
+        # Station id -> name of the person waiting there or None
+        self.waiting = [None] * len(self.stations)
+        for person in self.persons:
+            if person.status == "waiting" and self.waiting[person.location] is None:
+                self.waiting[person.location] = person.name
+
+    def copy(self):
+        """Makes a copy of the state that shares the persons, buses and bus schemas with this one
+
+        Note:
+            The lists are new, so elements can be replaced without changing this state. The elements themselves
+            must never be modified in place, use their replace method instead.
+            The waiting persons are shared too, they stay valid as long as no waiting person moves or boards a bus
+            in the copy.
+
+        :return: Information
+        """
+        new = copy(self)
+        new.persons = list(self.persons)
+        new.buses = list(self.buses)
+        if self.busIndexes is not None:
+            new.personIndexes = dict(self.personIndexes)
+            new.busIndexes = dict(self.busIndexes)
+        return new
+
+    def addBus(self, bus):
+        """Adds a bus at the end of the buses on route
+
+        :param bus: Bus
+        """
+        if self.busIndexes is None:
+            self.buildLookupTables()
+        self.busIndexes[(bus.nr, bus.leaveTime, bus.type)] = len(self.buses)
+        self.buses.append(bus)
+
+    def removeBus(self, index):
+        """Removes the bus at the index provided from the buses on route
 
-        self.minimumTicketPrice = min([x.ticketPrice for x in self.busSchemas])
-        self.minimumTravelTime = min([x.travelTime for x in self.busSchemas])
+        :param index: index in self.buses
+        :return: the removed Bus
+        """
+        if self.busIndexes is None:
+            self.buildLookupTables()
+        bus = self.buses.pop(index)
+        del self.busIndexes[(bus.nr, bus.leaveTime, bus.type)]
+        for nextIndex in range(index, len(self.buses)):
+            # The buses after it moved one position to the left
+            self.busIndexes[(self.buses[nextIndex].nr, self.buses[nextIndex].leaveTime,
+                             self.buses[nextIndex].type)] = nextIndex
+        return bus
 
     def getBus(self, nr, leaveTime, type):
         """Gets the index in self.buses for the bus indentified by the tuple (nr, leaveTime, type)
@@ -224,10 +386,9 @@ class Information:
         :param type: bus type
         :return: index or None if bus is not in list
         """
-        for index in range(len(self.buses)):
-            if (self.buses[index].nr, self.buses[index].leaveTime, self.buses[index].type) == (nr, leaveTime, type):
-                return index
-        return None
+        if self.busIndexes is None:
+            self.buildLookupTables()
+        return self.busIndexes.get((nr, leaveTime, type))
 
     def getBusSchema(self, nr):
         """Gets the index of the bus schema according to the provided number
@@ -235,10 +396,9 @@ class Information:
         :param nr: bus nr
         :return: index or None if busSchema is not in list
         """
-        for index in range(len(self.busSchemas)):
-            if self.busSchemas[index].nr == nr:
-                return index
-        return None
+        if self.busSchemaIndexes is None:
+            self.buildLookupTables()
+        return self.busSchemaIndexes.get(nr)
 
     def busesAtLocation(self, location, time):
         """
@@ -268,23 +428,19 @@ class Information:
         :param name: unique identifier for person
         :return: index or None if there is no person with that name
         """
-        for index in range(len(self.persons)):
-            if self.persons[index].name == name:
-                return index
-        return None
+        if self.personIndexes is None:
+            self.buildLookupTables()
+        return self.personIndexes.get(name)
 
     def getPersonWaitingAt(self, location):
         """Gets the name of the person waiting at the location provided
 
-        :param location: string of the station name
+        :param location: the id of the station
         :return: person name(string) or None if there's no person waiting in that location
         """
-        personWaiting = None
-        for index in range(len(self.persons)):
-            if self.persons[index].status == "waiting" and self.persons[index].location == location:
-                personWaiting = self.persons[index].name
-                break
-        return personWaiting
+        if self.waiting is None:
+            self.buildLookupTables()
+        return self.waiting[location]
 
     def stopGenerating(self):
         """With different methods, tests if there's no possible state change from this state
@@ -304,9 +460,10 @@ class Information:
         if len(self.persons) == 0:  # Final state, should stop generating
             return True
 
+        minimumTicketPrice = self.busSchemas[0].ticketPrice  # The schemas are sorted by the ticket price first
         answer1 = True
         for index in range(len(self.persons)):
-            if (self.persons[index].status == "waiting" and self.persons[index].budget - self.minimumTicketPrice >= 0 \
+            if (self.persons[index].status == "waiting" and self.persons[index].budget - minimumTicketPrice >= 0 \
                 and self.persons[index].visited != self.persons[index].nr_destinations - 1) \
                     or (self.persons[index].status == "travelling" \
                         and self.persons[index].visited != self.persons[index].nr_destinations - 1):
@@ -361,14 +518,14 @@ class Information:
 
         :return: True if this state is valid, False otherwise
         """
-        personsLocation = []
+        personsLocation = set()
         for index in range(len(self.persons)):
             if self.persons[index].status == "waiting" and \
                     self.persons[index].location in personsLocation:
                 # There's 2 persons at the same location! Something went wrong
                 return False
             elif self.persons[index].status == "waiting":
-                personsLocation.append(self.persons[index].location)
+                personsLocation.add(self.persons[index].location)
         return True
 
     def isFinal(self):
@@ -397,28 +554,75 @@ class Information:
                 s += str(bus) + "\n"
         return s
 
+    def stateKey(self):
+        """Canonical, immutable key of the state, two states are equal only if they have the same key
+
+        Note:
+            The key is made of the time, the persons sorted by name (location, status, bus, visited, budget and the
+            total time spent) and the buses sorted by their identifying tuple. Every bus on route is part of the key,
+            not only the occupied ones, because a generation that stops early can leave buses that weren't moved yet.
+
+        :return: tuple
+        """
+        persons = tuple(sorted((person.name, person.location, person.status, person.bus, person.visited,
+                                person.budget, person.waitingTime + person.travelTime) for person in self.persons))
+        buses = tuple(sorted((bus.nr, bus.leaveTime, bus.type, bus.currentStation, bus.routeIndex, bus.person)
+                             for bus in self.buses))
+        return self.time, persons, buses
+
+    def generationKey(self):
+        """Key of everything genereazaStari reads from the state, two states with the same key have the same successors
+
+        Note:
+            Besides the state key it has, for every person, the buses they are banned from (with the time of the ban),
+            their last action and the waiting and travelling times separately, then the time until which the departures
+            were added and, if a person finished in this state, the station where they finished. States with the same
+            state key but different generation keys can have different successors.
+
+        :return: tuple
+        """
+        persons = tuple(sorted((person.name, person.location, person.status, person.bus, person.visited,
+                                person.budget, person.waitingTime, person.travelTime,
+                                tuple(sorted(person.banned.items())), person.lastAction) for person in self.persons))
+        buses = tuple(sorted((bus.nr, bus.leaveTime, bus.type, bus.currentStation, bus.routeIndex, bus.person)
+                             for bus in self.buses))
+        finished = self.person.location if self.action == "finished" else None
+        return self.time, persons, buses, self.departedUntil, finished
+
+    def progressKey(self):
+        """Key of the progress of the state, the generation key without the budgets and the time spent by the persons
+
+        :return: tuple (key, tuple with the budgets of the persons, in the order of the persons in the key)
+        """
+        persons = sorted((person.name, person.location, person.status, person.bus, person.visited,
+                          tuple(sorted(person.banned.items())), person.lastAction, person.budget)
+                         for person in self.persons)
+        buses = tuple(sorted((bus.nr, bus.leaveTime, bus.type, bus.currentStation, bus.routeIndex, bus.person)
+                             for bus in self.buses))
+        finished = self.person.location if self.action == "finished" else None
+        return ((self.time, tuple(person[:-1] for person in persons), buses, self.departedUntil, finished),
+                tuple(person[-1] for person in persons))
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
-        if self.time != other.time or len(self.persons) != len(other.persons) or len(self.buses) != len(other.buses):
-            return False
-        for indexPerson in range(len(self.persons)):
-            otherIndexPerson = other.getPerson(self.persons[indexPerson].name)
-            if otherIndexPerson is None:
-                return False
-            if self.persons[indexPerson] != other.persons[otherIndexPerson]:
-                return False
-        for indexBus in range(len(self.buses)):
-            otherBusIndex = other.getBus(self.buses[indexBus].nr, self.buses[indexBus].leaveTime,
-                                         self.buses[indexBus].type)
-            if self.buses[indexBus] != other.buses[otherBusIndex]:
-                return False
-        return True
+        return self.stateKey() == other.stateKey()
+
+    def __hash__(self):
+        return hash(self.stateKey())
 
 
 class Node:
     """Node in the solution graph
+
+    Note:
+        To check for cycles every node knows the hashes of the states in its path. Nodes with the depth a multiple of
+        pathCheckpoint keep a frozenset with the hashes of all their ancestors and their own. The other nodes share
+        the set of the closest checkpoint above them, so a set is built only once every pathCheckpoint levels.
     """
+    __slots__ = ("info", "parent", "cost", "h", "waitingTime", "moneySpent", "f", "startTime", "depth", "keyHash",
+                 "pathHashes")
+    pathCheckpoint = 16
 
     def __init__(self, info, parent, cost, h, waitingTime, moneySpent, startTime):
         """__init__
@@ -440,6 +644,23 @@ class Node:
         self.f = self.cost + self.h
         self.startTime = startTime
 
+        self.keyHash = hash(info.stateKey())
+        if parent is None:
+            self.depth = 0
+            self.pathHashes = frozenset([self.keyHash])
+        else:
+            self.depth = parent.depth + 1
+            if self.depth % Node.pathCheckpoint == 0:
+                # Adding the hashes of the nodes in between this one and the previous checkpoint
+                hashes = [self.keyHash]
+                node = parent
+                while node.depth % Node.pathCheckpoint != 0:
+                    hashes.append(node.keyHash)
+                    node = node.parent
+                self.pathHashes = node.pathHashes.union(hashes)
+            else:
+                self.pathHashes = parent.pathHashes
+
     def getPath(self):
         """Makes a path from this node to it's root
 
@@ -448,8 +669,9 @@ class Node:
         l = [self]
         node = self
         while node.parent is not None:
-            l.insert(0, node.parent)
+            l.append(node.parent)
             node = node.parent
+        l.reverse()  # Collected from the leaf up, inserting at the front would be quadratic
         return l
 
     def pathString(self):
@@ -459,6 +681,7 @@ class Node:
         """
 
         path = self.getPath()
+        names = self.info.stations  # Station id -> name
         counter = 1  # Counting the nodes in the path
 
         lastCost = 0
@@ -485,7 +708,7 @@ class Node:
 
             if node.info.action == "finished":  # The person isn't in the list anymore
                 aux = f"Omul {node.info.person.name}"
-                aux += f" a coborat in statia {node.info.person.location} din autobuzul {node.info.bus.nr} si si-a terminat traseul"
+                aux += f" a coborat in statia {names[node.info.person.location]} din autobuzul {node.info.bus.nr} si si-a terminat traseul"
                 aux += f". Buget: {str(int(node.info.person.budget) if int(node.info.person.budget) == float(node.info.person.budget) else float(node.info.person.budget))}lei. Timp mers: {str(int(node.info.person.travelTime)) if int(node.info.person.travelTime) == float(node.info.person.travelTime) else float(node.info.person.travelTime)}min. Timp asteptare: {str(int(node.info.person.waitingTime) if int(node.info.person.waitingTime) == float(node.info.person.waitingTime) else float(node.info.person.waitingTime))}min"
                 personStrings.update({node.info.person.name: [aux]})
             for person in node.info.persons:
@@ -493,11 +716,11 @@ class Node:
                 if node.info.person.name == person.name:
                     # An action took place for this person
                     if node.info.action == "up":
-                        aux += f" a urcat in statia {person.location} in autobuzul {str(node.info.bus.nr)} pentru traseul " + "->".join(
-                            node.info.bus.route[node.info.bus.findStation(person.location):])
+                        aux += f" a urcat in statia {names[person.location]} in autobuzul {str(node.info.bus.nr)} pentru traseul " + "->".join(
+                            names[station] for station in node.info.bus.route[node.info.bus.findStation(person.location):])
                         aux += f". Buget: {str(int(person.budget) if int(person.budget) == float(person.budget) else float(person.budget))}lei. Timp mers: {str(int(person.travelTime) if int(person.travelTime) == float(person.travelTime) else float(person.travelTime))}min. Timp asteptare: {str(int(person.waitingTime) if int(person.waitingTime) == float(person.waitingTime) else float(person.waitingTime))}min"
                     elif node.info.action == "down":
-                        aux += f" a coborat in statia {person.location} din autobuzul {str(node.info.bus.nr)}."
+                        aux += f" a coborat in statia {names[person.location]} din autobuzul {str(node.info.bus.nr)}."
                         aux += f" Buget: {str(int(person.budget) if int(person.budget) == float(person.budget) else float(person.budget))}lei. Timp mers: {str(int(person.travelTime) if int(person.travelTime) == float(person.travelTime) else float(person.travelTime))}min. Timp asteptare: {str(int(person.waitingTime) if int(person.waitingTime) == float(person.waitingTime) else float(person.waitingTime))}min"
                     if person.name not in personStrings:
                         personStrings[person.name] = [aux]
@@ -512,11 +735,11 @@ class Node:
                         "urcat") != -1]) == 0:
                     # Checking if the person hasn't already had an action made
                     if person.status == "waiting":
-                        aux += f" asteapta in statia {person.location}. Buget: {str(int(person.budget) if int(person.budget) == float(person.budget) else float(person.budget))}lei. Timp mers: {str(int(person.travelTime) if int(person.travelTime) == float(person.travelTime) else float(person.travelTime))}min. Timp asteptare: {str(int(person.waitingTime) if int(person.waitingTime) == float(person.waitingTime) else float(person.waitingTime))}min"
+                        aux += f" asteapta in statia {names[person.location]}. Buget: {str(int(person.budget) if int(person.budget) == float(person.budget) else float(person.budget))}lei. Timp mers: {str(int(person.travelTime) if int(person.travelTime) == float(person.travelTime) else float(person.travelTime))}min. Timp asteptare: {str(int(person.waitingTime) if int(person.waitingTime) == float(person.waitingTime) else float(person.waitingTime))}min"
                     else:
                         bus = node.info.buses[node.info.getBus(person.bus[0], person.bus[1], person.bus[2])]
-                        aux += f" se deplaseaza cu autobuzul {str(bus.nr)} de la statia {bus.currentStation} la statia {bus.route[bus.routeIndex + 1]} pe traseul " + "->".join(
-                            bus.route[bus.findStation(bus.currentStation):])
+                        aux += f" se deplaseaza cu autobuzul {str(bus.nr)} de la statia {names[bus.currentStation]} la statia {names[bus.route[bus.routeIndex + 1]]} pe traseul " + "->".join(
+                            names[station] for station in bus.route[bus.findStation(bus.currentStation):])
                         aux += f"Buget: {str(int(person.budget) if int(person.budget) == float(person.budget) else float(person.budget))}lei. Timp mers: {str(int(person.travelTime) if int(person.travelTime) == float(person.travelTime) else float(person.travelTime))}min. Timp asteptare: {str(int(person.waitingTime) if int(person.waitingTime) == float(person.waitingTime) else float(person.waitingTime))}min"
                     personStrings.update({person.name: [aux]})
 
@@ -529,7 +752,7 @@ class Node:
             # This action being the final one, definitely is of a person finishing
             print("The last action isn't a person finishing")
             exit()
-        aux = f"Omul {node.info.person.name} a coborat in statia {node.info.person.location} din autobuzul {str(node.info.bus.nr)} si si-a terminat traseul"
+        aux = f"Omul {node.info.person.name} a coborat in statia {names[node.info.person.location]} din autobuzul {str(node.info.bus.nr)} si si-a terminat traseul"
         aux += f". Buget: {str(int(node.info.person.budget) if int(node.info.person.budget) == float(node.info.person.budget) else float(node.info.person.budget))}lei. Timp mers: {str(int(node.info.person.travelTime)) if int(node.info.person.travelTime) == float(node.info.person.travelTime) else float(node.info.person.travelTime)}min. Timp asteptare: {str(int(node.info.person.waitingTime) if int(node.info.person.waitingTime) == float(node.info.person.waitingTime) else float(node.info.person.waitingTime))}min"
         personStrings.update({node.info.person.name: [aux]})
         listString.append(f"{str(counter)})\n{minutesToTime(node.info.time + start)}\n")
@@ -540,17 +763,39 @@ class Node:
         counter += 1
         return len(path), "".join(listString)
 
+    def pathEvents(self):
+        """The actions on the path from the root to this node, as data
+
+        :return: list of dict with the time (HH:MM), person, action ("up", "down" or "finished"), bus number, station
+         and cost until then
+        """
+        start = timeToMinutes(self.startTime)
+        events = []
+        for node in self.getPath()[1:]:  # The root has no action
+            events.append({"time": minutesToTime(int(node.info.time + start)), "person": node.info.person.name,
+                           "action": node.info.action, "bus": node.info.bus.nr,
+                           "station": node.info.stations[node.info.person.location].strip('"'), "cost": node.cost})
+        return events
+
     def isInPath(self, newNode):
         """Checks if the node is in the path from the root to this node
 
         :return: True if node is in path, False otherwise
         """
         node = self
-        while node is not None:
-            if newNode.info == node.info:
+        while node.depth % Node.pathCheckpoint != 0:
+            # The nodes under the last checkpoint aren't in its set
+            if newNode.keyHash == node.keyHash and newNode.info == node.info:
                 return True
             node = node.parent
 
+        if newNode.keyHash not in node.pathHashes:
+            return False
+        # There's a state with the same hash, the full states are compared only for the nodes with this hash
+        while node is not None:
+            if newNode.keyHash == node.keyHash and newNode.info == node.info:
+                return True
+            node = node.parent
         return False
 
     def isFinal(self):
@@ -578,6 +823,100 @@ class Node:
         return sir
 
 
+class Solution:
+    """A solution found by a search, keeps only the final node
+
+    Note:
+        The cost, the length and the statistics of the search are taken when the solution is found, the path is
+        formatted only when the solution is written, so the callers that only need the costs don't pay for it
+    """
+    __slots__ = ("node", "cost", "length", "stats", "instrumentation")
+
+    def __init__(self, node, gr, startTime, maxNodesMemory, nodesCalculated, maxStackDepth=None):
+        """__init__
+
+        :param node: the final Node
+        :param gr: Graph, for the heuristic cache counters
+        :param startTime: time.time() when the search started
+        :param maxNodesMemory: maximum number of nodes in memory until now
+        :param nodesCalculated: number of nodes calculated until now
+        :param maxStackDepth: maximum depth of the stack, only for the depth first searches
+        """
+        self.node = node
+        self.cost = node.cost
+        self.length = node.depth
+        self.stats = {"maxNodesMemory": maxNodesMemory, "nodesCalculated": nodesCalculated}
+        if maxStackDepth is not None:
+            self.stats["maxStackDepth"] = maxStackDepth
+        self.stats["heuristicHits"] = gr.heuristicHits
+        self.stats["heuristicMisses"] = gr.heuristicMisses
+        self.stats["time"] = time.time() - startTime
+        self.instrumentation = gr.instrumentation  # Measures pathString too, if the search is instrumented
+        if gr.instrumentation is not None:
+            # pathString runs after the solution is made, so its time is only reported for the whole search
+            self.stats["instrumentation"] = gr.instrumentation.snapshot()
+            del self.stats["instrumentation"]["times"]["pathString"]
+
+    def pathString(self):
+        """Formats the path of the solution
+
+        :return: string
+        """
+        if self.instrumentation is None:
+            return self.node.pathString()[1]
+        started = self.instrumentation.start()
+        path = self.node.pathString()[1]
+        self.instrumentation.stop("pathString", started)
+        return path
+
+    def record(self):
+        """The solution as data, for the JSON Lines and binary output
+
+        :return: dict with the cost, length, statistics and the actions on the path
+        """
+        return {"cost": self.cost, "length": self.length, "stats": dict(self.stats), "path": self.node.pathEvents()}
+
+    def __str__(self):
+        listString = ["Solutie: \n", self.pathString(), f"Lungimea drumului este: {str(self.length)} \n",
+                      f"Costul drumului este: {str(self.cost)}\n",
+                      f"Numarul maxim de noduri in memorie: {str(self.stats['maxNodesMemory'])}\n",
+                      f"Numarul total de noduri calculate: {str(self.stats['nodesCalculated'])}\n"]
+        if "maxStackDepth" in self.stats:
+            listString.append(f"Adancimea maxima a stivei: {str(self.stats['maxStackDepth'])}\n")
+        if "dominatedPruned" in self.stats:
+            listString.append(f"Stari dominate eliminate: {str(self.stats['dominatedPruned'])}\n")
+        if "tableReused" in self.stats:
+            listString.append(f"Tabela de transpozitie: succesori refolositi {str(self.stats['tableReused'])}, "
+                              f"subarbori necautati din nou {str(self.stats['tablePruned'])}, "
+                              f"stari eliminate {str(self.stats['tableEvicted'])}\n")
+        if "suboptimalityBound" in self.stats:
+            if self.stats["suboptimalityBound"] is None:
+                listString.append("Marginea de suboptimalitate: nu exista, euristica nu este admisibila\n")
+            else:
+                listString.append(f"Marginea de suboptimalitate: costul este cel mult "
+                                  f"{str(self.stats['suboptimalityBound'])} * costul minim\n")
+        if "evicted" in self.stats:
+            listString.append(f"Noduri eliminate din memorie: {str(self.stats['evicted'])}\n")
+        if "weight" in self.stats:
+            listString.append(f"Ponderea euristicii: {str(self.stats['weight'])}\n")
+        if "beamWidth" in self.stats:
+            listString.append(f"Latimea fasciculului: {str(self.stats['beamWidth'])}\n")
+        listString.append(f"Euristica luata din cache: {str(self.stats['heuristicHits'])}, calculata: "
+                          f"{str(self.stats['heuristicMisses'])}\n")
+        listString.append(f"Solutia a fost gasita in {str(self.stats['time'])}\n")
+        if "instrumentation" in self.stats:
+            instrumentation = self.stats["instrumentation"]
+            times = instrumentation["times"]
+            listString.append(f"Timp in genereazaSuccesori: {times['genereazaSuccesori']:.4f}s, calculeaza_h: "
+                              f"{times['calculeaza_h']:.4f}s, verificari de duplicate: "
+                              f"{times['duplicateChecks']:.4f}s\n")
+            listString.append(f"Copii ale obiectelor: {str(instrumentation['copies'])}\n")
+            for label, name in [("Factorul de ramificare", "branching"), ("Pasi de timp per expandare", "timeSteps")]:
+                listString.append(f"{label}: medie {instrumentation[name]['mean']:.2f}, distributie "
+                                  f"{instrumentation[name]['distribution']}\n")
+        return "".join(listString)
+
+
 def timeToMinutes(time):
     """Transforms the time in minutes
 
@@ -599,9 +938,262 @@ def minutesToTime(minutes):
     return '{:02d}:{:02d}'.format(*divmod(int(minutes), 60))
 
 
+class Timetable:
+    """Precomputed schedule of all the buses that leave the depots in the simulated time
+
+    Note:
+        A bus that left the depot at leaveTime is in station route[i] at leaveTime + i * travelTime, so the position
+        of every bus is known before the search starts. Buses are identified by the tuple (nr, leaveTime, type).
+        The sorted list of the times buses leave or reach a station is the event queue of the simulation. It is
+        shared by all the states, a state only needs its time to find the next event.
+    """
+
+    def __init__(self, busSchemas, duration):
+        """__init__
+
+        :param busSchemas: list of BusSchema, in the order buses are added on route
+        :param duration: the time in minutes after which no bus leaves the depots
+        """
+        self.departures = {}  # time -> list of BusSchema that have buses leaving the depots
+        self.moves = {}  # time -> list of buses that reach a station, in the order they were added on route
+        self.stationTimes = {}  # station -> sorted list of times a bus is in the station
+        self.stationBuses = {}  # station -> list of (nr, leaveTime, type, routeIndex), same order as stationTimes
+        self.times = []  # Sorted list of the times something happens (a bus leaves or reaches a station)
+
+        events = []
+        for schemaIndex, busSchema in enumerate(busSchemas):
+            departure = 0
+            while departure * busSchema.tplec <= duration:
+                leaveTime = departure * busSchema.tplec
+                self.departures.setdefault(leaveTime, []).append(busSchema)
+                for typeIndex, (type, route) in enumerate([("normal", busSchema.route),
+                                                           ("reverse", busSchema.reverseRoute)]):
+                    for routeIndex in range(len(route)):
+                        events.append((leaveTime + routeIndex * busSchema.travelTime, leaveTime, schemaIndex,
+                                       typeIndex, busSchema.nr, type, routeIndex, route[routeIndex]))
+                departure += 1
+
+        events.sort()
+        for eventTime, leaveTime, _, _, nr, type, routeIndex, station in events:
+            self.moves.setdefault(eventTime, []).append((nr, leaveTime, type))
+            self.stationTimes.setdefault(station, []).append(eventTime)
+            self.stationBuses.setdefault(station, []).append((nr, leaveTime, type, routeIndex))
+        self.times = sorted(self.moves.keys())
+
+    def departuresAt(self, time):
+        """Gets the schemas of the buses that leave the depots at the time provided
+
+        :param time: time in minutes
+        :return: list of BusSchema
+        """
+        return self.departures.get(time, [])
+
+    def movesAt(self, time):
+        """Gets the buses that are in a station at the time provided (including the ones leaving the depots)
+
+        :param time: time in minutes
+        :return: list of (nr, leaveTime, type), in the order the buses were added on route
+        """
+        return self.moves.get(time, [])
+
+    def nextTime(self, time):
+        """Gets the first time after the one provided when a bus leaves or reaches a station
+
+        :param time: time in minutes
+        :return: time in minutes or None if nothing happens after this time
+        """
+        index = bisect.bisect_right(self.times, time)
+        if index == len(self.times):
+            return None
+        return self.times[index]
+
+    def busesAt(self, station, time):
+        """Gets the buses that are in the station at the time provided
+
+        :param station: int, id of the station
+        :param time: time in minutes
+        :return: list of (nr, leaveTime, type, routeIndex), in the order the buses were added on route
+        """
+        times = self.stationTimes.get(station)
+        if times is None:
+            return []
+        return self.stationBuses[station][bisect.bisect_left(times, time):bisect.bisect_right(times, time)]
+
+    def nextArrival(self, station, time):
+        """Gets the first bus that reaches the station after the time provided
+
+        :param station: int, id of the station
+        :param time: time in minutes
+        :return: tuple (arrival time, (nr, leaveTime, type, routeIndex)) or None if no bus reaches the station after
+         this time
+        """
+        times = self.stationTimes.get(station, [])
+        index = bisect.bisect_right(times, time)
+        if index == len(times):
+            return None
+        return times[index], self.stationBuses[station][index]
+
+
+class DistanceTables:
+    """Minimum travel time and minimum fare in between every two stations of the route network
+
+    Note:
+        times[a][b] is the shortest time a bus ride from a to b can take, using only the travel times in between
+        consecutive stations. fares[a][b] is the minimum money spent to get from a to b, a ticket paying for any
+        number of stations on the same bus. Waiting, schedules and the other persons are ignored, so both are lower
+        bounds of what a person actually spends. Both tables are computed once per graph (Floyd-Warshall).
+    """
+
+    def __init__(self, busSchemas, persons, nrStations):
+        """__init__
+
+        :param busSchemas: list of BusSchema
+        :param persons: list of Person, as they are in the initial state
+        :param nrStations: number of station ids
+        """
+        infinity = float('inf')
+        self.times = [[0 if a == b else infinity for b in range(nrStations)] for a in range(nrStations)]
+        self.fares = [[0 if a == b else infinity for b in range(nrStations)] for a in range(nrStations)]
+        self.travelTimes = {}  # Bus nr -> time in between two stations
+        self.routes = {}  # (bus nr, type) -> route
+        for busSchema in busSchemas:
+            self.travelTimes[busSchema.nr] = busSchema.travelTime
+            self.routes[(busSchema.nr, "normal")] = busSchema.route
+            self.routes[(busSchema.nr, "reverse")] = busSchema.reverseRoute
+            route = busSchema.route
+            for index in range(len(route) - 1):
+                a, b = route[index], route[index + 1]
+                if busSchema.travelTime < self.times[a][b]:
+                    self.times[a][b] = self.times[b][a] = busSchema.travelTime
+            for a in route:
+                for b in route:
+                    if a != b and busSchema.ticketPrice < self.fares[a][b]:
+                        self.fares[a][b] = busSchema.ticketPrice
+
+        for table in (self.times, self.fares):
+            for k in range(nrStations):
+                rowK = table[k]
+                for a in range(nrStations):
+                    rowA = table[a]
+                    throughK = rowA[k]
+                    if throughK == infinity:
+                        continue
+                    for b in range(nrStations):
+                        if throughK + rowK[b] < rowA[b]:
+                            rowA[b] = throughK + rowK[b]
+
+        # Person name -> list, remaining[i] is the minimum cost of going from destinations[i] through the rest
+        self.remaining = {}
+        self.destinations = {}  # Person name -> list of station ids
+        for person in persons:
+            self.destinations[person.name] = person.destinations
+            remaining = [0] * person.nr_destinations
+            for index in range(person.nr_destinations - 2, -1, -1):
+                a, b = person.destinations[index], person.destinations[index + 1]
+                remaining[index] = remaining[index + 1] + self.times[a][b] + self.fares[a][b]
+            self.remaining[person.name] = remaining
+
+        self.arrays = None  # The tables as NumPy arrays, built the first time a batch of states is evaluated
+
+    def personBound(self, person, time):
+        """Lower bound of the cost a person still adds until they finish
+
+        Note:
+            A travelling person already paid for their bus and may stay on it, so the ticket to the next destination
+            isn't counted. Their position is taken from the schedule of the bus, and the time passed since the bus
+            left its last station is subtracted from the travel time.
+
+        :param person: Person that didn't finish
+        :param time: time of the state
+        :return: float
+        """
+        target = person.destinations[person.visited + 1]
+        bound = self.remaining[person.name][person.visited + 1]
+        if person.status == "travelling":
+            nr, leaveTime, type = person.bus
+            route = self.routes[(nr, type)]
+            travelTime = self.travelTimes[nr]
+            routeIndex = min(int((time - leaveTime) // travelTime), len(route) - 1)
+            elapsed = time - leaveTime - routeIndex * travelTime
+            return bound + max(0, self.times[route[routeIndex]][target] - elapsed)
+        return bound + self.times[person.location][target] + self.fares[person.location][target]
+
+    def buildArrays(self):
+        """Builds the NumPy version of the tables, used by personBounds
+
+        :return: dict with the arrays and the indexes into them
+        """
+        if self.arrays is not None:
+            return self.arrays
+        offsets = {}  # Person name -> index of their first destination in the flat arrays
+        destinations = []
+        remaining = []
+        for name in self.remaining:
+            offsets[name] = len(destinations)
+            destinations.extend(self.destinations[name])
+            remaining.extend(self.remaining[name])
+        routeIds = {}  # (bus nr, type) -> row in the route matrix
+        routeLength = max([len(route) for route in self.routes.values()], default=1)
+        routes = numpy.zeros((max(len(self.routes), 1), routeLength), dtype=numpy.int64)
+        lengths = numpy.ones(max(len(self.routes), 1), dtype=numpy.int64)
+        travelTimes = numpy.ones(max(len(self.routes), 1))
+        for routeId, ((nr, type), route) in enumerate(self.routes.items()):
+            routeIds[(nr, type)] = routeId
+            routes[routeId, :len(route)] = route
+            lengths[routeId] = len(route)
+            travelTimes[routeId] = self.travelTimes[nr]
+        self.arrays = {"times": numpy.array(self.times, dtype=float), "fares": numpy.array(self.fares, dtype=float),
+                       "offsets": offsets, "destinations": numpy.array(destinations, dtype=numpy.int64),
+                       "remaining": numpy.array(remaining, dtype=float), "routeIds": routeIds, "routes": routes,
+                       "routeLengths": lengths, "travelTimes": travelTimes}
+        return self.arrays
+
+    def personBounds(self, batch):
+        """Same as personBound, for every person of a batch of states at once
+
+        :param batch: dict of arrays built by Graph.personArrays
+        :return: numpy array with the bound of every person
+        """
+        arrays = self.buildArrays()
+        index = batch["destinationIndex"]
+        target = arrays["destinations"][index]
+        bound = arrays["remaining"][index]
+        location = batch["location"]
+
+        routeId = batch["routeId"]
+        sinceLeave = batch["time"] - batch["leaveTime"]
+        travelTime = arrays["travelTimes"][routeId]
+        routeIndex = numpy.minimum(numpy.floor_divide(sinceLeave, travelTime).astype(numpy.int64),
+                                   arrays["routeLengths"][routeId] - 1)
+        elapsed = sinceLeave - routeIndex * travelTime
+        station = arrays["routes"][routeId, routeIndex]
+        travelling = bound + numpy.maximum(0, arrays["times"][station, target] - elapsed)
+        waiting = bound + arrays["times"][location, target] + arrays["fares"][location, target]
+        return numpy.where(batch["waiting"], waiting, travelling)
+
+
 class Graph:
     """Models the solution graph
     """
+    heuristicCacheSize = 100000  # Maximum number of heuristic values kept, 0 disables the cache
+    # Number of successors from which the heuristic is calculated with NumPy, in a batch, 0 to never do it. Off by
+    # default: getting the attributes out of the persons costs about as much as the heuristics themselves
+    batchHeuristicMinimum = 0
+    # States kept by ida_star and depth_first_iterativ across iterations, 0 for none, set with --table-size
+    transpositionTableSize = 20000
+    # a_star_optimizat rejects the states dominated by another one with the same progress (DominanceIndex). Off by
+    # default, set with --dominance on, the statistics of the search change with it
+    dominancePruning = False
+    aStarWeight = 2.0  # The weight of the heuristic in weighted_a_star, f = g + aStarWeight * h
+    beamWidth = 100  # Nodes kept on every level by beam_search
+    # anytime_a_star starts with this weight of the heuristic and lowers it by anytimeWeightStep after every solution
+    anytimeWeight = 3.0
+    anytimeWeightStep = 0.5
+    # The heuristics that never overestimate, only these get a suboptimality bound. "euristica banala" gives 1 for a
+    # state that isn't final even when the moves left cost less (or nothing), "euristica admisibila 2" and
+    # "euristica admisibila 3" count a whole travel time for the station a travelling person is already going to
+    admissibleHeuristics = ("euristica admisibila 1", "euristica admisibila 4")
+    smaNodeBudget = 1000  # Maximum number of nodes sma_star keeps in memory
 
     def __init__(self, startTime, endTime, startNode):
         """__init__
@@ -621,6 +1213,39 @@ class Graph:
         self.startNode.info.time = 0  # Making sure that the root
         # starts at time 0
 
+        # Every bus that will be on route is known from the start
+        self.timetable = Timetable(self.startNode.info.busSchemas, self.duration)
+
+        # The route network doesn't change either, so the lower bounds in between stations are computed only once
+        info = self.startNode.info
+        nrStations = 1 + max([station for busSchema in info.busSchemas for station in busSchema.route] +
+                             [station for person in info.persons for station in person.destinations])
+        self.distances = DistanceTables(info.busSchemas, info.persons, nrStations)
+
+        # Constants of the heuristics, the schemas are the same in every state
+        self.maxTicketPrice = max([busSchema.ticketPrice for busSchema in info.busSchemas], default=0)
+        self.maxTravelTime = max([busSchema.travelTime for busSchema in info.busSchemas], default=0)
+        self.minimumTicketPrice = min([busSchema.ticketPrice for busSchema in info.busSchemas])
+        self.minimumTravelTime = min([busSchema.travelTime for busSchema in info.busSchemas])
+
+        # Least recently used cache of the heuristic values, keyed by the progress of the persons
+        self.heuristicCache = OrderedDict()
+        self.heuristicHits = 0
+        self.heuristicMisses = 0
+
+        # Shared array [max nodes in memory, nodes calculated, nodes expanded] updated during the search
+        # when it runs in a worker process, so the statistics survive if the process is killed
+        self.progress = None
+        self.instrumentation = None  # Instrumentation of the running search, if it is instrumented
+
+    def reportMemory(self, nrNodes):
+        """Records the number of nodes the search keeps in memory, for the partial statistics
+
+        :param nrNodes: number of nodes in memory
+        """
+        if self.progress is not None and nrNodes > self.progress[0]:
+            self.progress[0] = nrNodes
+
     def isFinal(self, nodCurent):
         return nodCurent.info.isFinal()
 
@@ -631,18 +1256,78 @@ class Graph:
         :param tip_euristica: type of heuristic
         :return: list of Node
         """
-        listaSuccesori = []
+        return list(self.genereazaSuccesoriLazy(nodCurent, tip_euristica))
+
+    def genereazaSuccesoriLazy(self, nodCurent, tip_euristica="euristica banala", entry=None):
+        """Generates the children nodes from the node provided one at a time, in the same order as genereazaSuccesori
+
+        Note:
+            The actions are simulated one time step at a time, and the nodes of a step are given before the next
+            step is simulated. A search that stops early never simulates the rest of the steps.
+            When an entry of a TranspositionTable is given, the children of the state are taken from it if they were
+            generated before, otherwise they are saved in it once all of them are generated.
+
+        :param nodCurent: node for checking
+        :param tip_euristica: type of heuristic
+        :param entry: TableEntry of the state of the node or None
+        :return: generator of Node
+        """
+        if self.progress is not None:
+            self.progress[2] += 1
+        if entry is not None and entry.successors is not None:
+            states = entry.successors
+        else:
+            states = self.genereazaStari(nodCurent.info, tip_euristica)
+            if entry is not None:
+                states = entry.record(states)
+        instrumentation = self.instrumentation
+        nrSuccessors = 0
+        for possibleNodeInfo, moveCost, timeCost, moneyCost, h in states:
+            possibleNode = Node(possibleNodeInfo, nodCurent, moveCost + nodCurent.cost, h, timeCost, moneyCost,
+                                self.startTime)
+            if instrumentation is not None:
+                started = instrumentation.start()
+                inPath = nodCurent.isInPath(possibleNode)
+                instrumentation.stop("duplicateChecks", started)
+            else:
+                inPath = nodCurent.isInPath(possibleNode)
+            if not inPath:
+                nrSuccessors += 1
+                if self.progress is not None:
+                    self.progress[1] += 1
+                yield possibleNode
+        if instrumentation is not None:
+            instrumentation.distributions["branching"][nrSuccessors] += 1
+
+    def genereazaStari(self, info, tip_euristica="euristica banala"):
+        """Simulates the actions that can happen from the state provided and gives the resulting states
+
+        Note:
+            The states don't depend on the path to the state provided, so they can be reused for every node of it
 
-        current = deepcopy(nodCurent.info)
-        # So we won't modify something
+        :param info: Information of the node expanded
+        :param tip_euristica: type of heuristic
+        :return: generator of tuples (Information, move cost, time cost, money cost, h)
+        """
+        possibleStates = []  # (Information, move cost, time cost, money cost) found at the current time step
+
+        # The simulation is timed without calculeaza_h and without the time the states wait to be used
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            started = instrumentation.start()
+        copies = 1  # Objects copied and not counted yet, current is the first
+        steps = 0
+        current = info.copy()
+        # So we won't modify something. Persons, buses and schemas are shared with the parent
+        # so they are never modified, only replaced in the lists of current
 
         time = int(current.time)
         lastTime = time
-        nextTimes = current.nextTimes
         breakFlag = False
 
         # Going to generate everything from that duration
         while time <= self.duration and not breakFlag:
+            steps += 1
             if current.stopGenerating():
                 # There's no more actions that could happen
                 break
@@ -654,126 +1339,110 @@ class Graph:
             # print(f"\n\n-----------------------{time}-------------------------------")
             # First we check if we can add buses on the route
             # making sure that we don't add them if they were already added
-
-            for busSchema in current.busSchemas:
-                if time % busSchema.tplec == 0:
-                    # This is a time where buses leave
-
-                    # print("Ar trebui sa adaugam autobuze, verificam daca nu cumva le-am adaugat deja!")
-                    # print(f"Nr. autobuze plecate pe traseu: {busSchema.busesOnRoute}, "
-                    #      f"nr. de autobuze disparute: {busSchema.nrDisappearedBuses}")
-                    # print(f"Nr. autobuze ce ar trb sa fi plecat "
-                    #      f"{2 * (time / busSchema.tplec) + 2 },"
-                    #      f"nr ce au plecat: {busSchema.busesOnRoute}")
-
-                    if busSchema.busesOnRoute > 2 * (time / busSchema.tplec) + 2:
-                        # print("Should now add buses!")
-                        continue
-                        # print(nodCurent)
-                        # print(current)
-
-                    if 2 * (time / busSchema.tplec) + 2 > busSchema.busesOnRoute:
-                        # We need to add 2 buses, one from the very left station and one from the very right
-                        busSchema.busesOnRoute += 2
-                        # Because every action can take place only at appearance of buses or when buses reach
-                        # a new station we can make a list of the times we need to check
-                        if time + busSchema.tplec not in nextTimes:
-                            # print(f"Actiune viitoare la timpul {time + busSchema.tplec}")
-                            nextTimes.append(time + busSchema.tplec)
-                        if time + busSchema.travelTime not in nextTimes:
-                            # print(f"Actiune viitoare la timpul {time + busSchema.travelTime}")
-                            nextTimes.append(time + busSchema.travelTime)
-                        # print(f"Autobuze noi pe nr {busSchema.nr}")
-                        newBus = Bus(busSchema.nr, busSchema.route, time,  # the time the bus went on route
-                                     busSchema.travelTime, busSchema.ticketPrice, "normal")  # from left to right
-                        current.buses.append(newBus)  # add it to the list
-                        personName = current.getPersonWaitingAt(newBus.currentStation)
-
-                        if personName is not None:
-                            personIndex = current.getPerson(personName)
-                            if (newBus.nr, newBus.type) not in current.persons[personIndex].banned.keys() \
-                                    and current.persons[personIndex].budget - newBus.ticketPrice >= 0 \
-                                    and not (current.persons[personIndex].lastAction[0] == "down" and \
-                                             current.persons[personIndex].lastAction[3] == newBus.nr):
-                                # The person can board the bus! So we mark it to know when we finish
-                                # to add/move all buses at the time
-                                # print(f"Autobuz nou, persoana nebanata in statie {personName} => POSIBILA STARE")
-                                updatedPerson = deepcopy(current.persons[personIndex])
-                                updatedPerson.status = "travelling"
-                                updatedPerson.budget -= newBus.ticketPrice
-                                # The banned buses for the person are reset
-                                # and we mark the bus they're boarding, so they won't try
-                                # to get back up the one they got down from
-                                updatedPerson.banned = {}
-                                updatedPerson.bus = (newBus.nr, newBus.leaveTime, newBus.type)
-
-                                updatedBus = deepcopy(newBus)
-                                updatedBus.person = updatedPerson.name
-                                if updatedPerson.waitingTime + updatedPerson.travelTime != time:
-                                    updatedPerson.waitingTime += (time - lastTime)
-                                updatedPerson.lastAction = ("up", newBus.currentStation, time, newBus.nr)
-                                possibleActions.append(["up", updatedPerson, updatedBus])
-
-                                # Now we have to ban the bus for the actual person we have
-                                # because we generated an action of them boarding this type of bus
-                                current.persons[personIndex].banned.update({(newBus.nr, newBus.type): time})
-                        # If there's no person in station or the person can't get on the bus
-                        # no action is left
-
-                        newBus = Bus(busSchema.nr, busSchema.route[::-1], time,  # the time the bus went on route
-                                     busSchema.travelTime, busSchema.ticketPrice, "reverse")  # from right to left
-                        # so we reverse the route
-                        current.buses.append(newBus)  # add it to the list
-                        personName = current.getPersonWaitingAt(newBus.currentStation)
-
-                        if personName is not None:
-                            personIndex = current.getPerson(personName)
-                            if (newBus.nr, newBus.type) not in current.persons[personIndex].banned.keys() \
-                                    and current.persons[personIndex].budget - newBus.ticketPrice >= 0 and \
-                                    not (current.persons[personIndex].lastAction[0] == "down" and \
-                                         current.persons[personIndex].lastAction[3] == newBus.nr):
-                                # The person can board the bus! So we mark it to know when we finish
-                                # to add/move all buses at the time
-                                # print(f"Autobuz nou, persoana nebanata in statie {personName} => POSIBILA STARE")
-
-                                updatedPerson = deepcopy(current.persons[personIndex])
-                                updatedPerson.status = "travelling"
-                                updatedPerson.budget -= newBus.ticketPrice
-                                # The banned buses for the person are reset
-                                # and we mark the bus they're boarding, so they won't try
-                                # to get back up the one they got down from
-                                updatedPerson.banned = {}
-                                updatedPerson.bus = (newBus.nr, newBus.leaveTime, newBus.type)
-                                if updatedPerson.waitingTime + updatedPerson.travelTime != time:
-                                    updatedPerson.waitingTime += (time - lastTime)
-                                updatedBus = deepcopy(newBus)
-                                updatedBus.person = updatedPerson.name
-                                updatedPerson.lastAction = ("up", newBus.currentStation, time, newBus.nr)
-                                possibleActions.append(["up", updatedPerson, updatedBus])
-
-                                # Now we have to ban the bus for the actual person we have
-                                # because we generated an action of them boarding this type of bus
-                                current.persons[personIndex].banned.update({(newBus.nr, newBus.type): time})
-                        # If there's no person in station or the person can't get on the bus
-                        # no action is left
+            # (a state created at this time already has them on route)
+            departingSchemas = self.timetable.departuresAt(time) if time > current.departedUntil else []
+            current.departedUntil = max(current.departedUntil, time)
+            for busSchema in departingSchemas:
+                # We need to add 2 buses, one from the very left station and one from the very right
+                # print(f"Autobuze noi pe nr {busSchema.nr}")
+                newBus = Bus(busSchema.nr, busSchema.route, time,  # the time the bus went on route
+                             busSchema.travelTime, busSchema.ticketPrice, "normal",  # from left to right
+                             busSchema.stationIndex)
+                current.addBus(newBus)  # add it to the list
+                personName = current.getPersonWaitingAt(newBus.currentStation)
+
+                if personName is not None:
+                    personIndex = current.getPerson(personName)
+                    if (newBus.nr, newBus.type) not in current.persons[personIndex].banned.keys() \
+                            and current.persons[personIndex].budget - newBus.ticketPrice >= 0 \
+                            and not (current.persons[personIndex].lastAction[0] == "down" and \
+                                     current.persons[personIndex].lastAction[3] == newBus.nr):
+                        # The person can board the bus! So we mark it to know when we finish
+                        # to add/move all buses at the time
+                        # print(f"Autobuz nou, persoana nebanata in statie {personName} => POSIBILA STARE")
+                        updatedPerson = copy(current.persons[personIndex])
+                        updatedPerson.status = "travelling"
+                        updatedPerson.budget -= newBus.ticketPrice
+                        # The banned buses for the person are reset
+                        # and we mark the bus they're boarding, so they won't try
+                        # to get back up the one they got down from
+                        updatedPerson.banned = {}
+                        updatedPerson.bus = (newBus.nr, newBus.leaveTime, newBus.type)
+
+                        updatedBus = newBus.replace(person=updatedPerson.name)
+                        if updatedPerson.waitingTime + updatedPerson.travelTime != time:
+                            updatedPerson.waitingTime += (time - lastTime)
+                        updatedPerson.lastAction = ("up", newBus.currentStation, time, newBus.nr)
+                        possibleActions.append(["up", updatedPerson, updatedBus])
+
+                        # Now we have to ban the bus for the actual person we have
+                        # because we generated an action of them boarding this type of bus
+                        current.persons[personIndex] = current.persons[personIndex].replace(
+                            banned={**current.persons[personIndex].banned, (newBus.nr, newBus.type): time})
+                        copies += 3  # The person boarding, the bus and the person with the bus banned
+                # If there's no person in station or the person can't get on the bus
+                # no action is left
+
+                newBus = Bus(busSchema.nr, busSchema.reverseRoute, time,  # the time the bus went on route
+                             busSchema.travelTime, busSchema.ticketPrice, "reverse",  # from right to left
+                             busSchema.reverseStationIndex)
+                # so we reverse the route
+                current.addBus(newBus)  # add it to the list
+                personName = current.getPersonWaitingAt(newBus.currentStation)
+
+                if personName is not None:
+                    personIndex = current.getPerson(personName)
+                    if (newBus.nr, newBus.type) not in current.persons[personIndex].banned.keys() \
+                            and current.persons[personIndex].budget - newBus.ticketPrice >= 0 and \
+                            not (current.persons[personIndex].lastAction[0] == "down" and \
+                                 current.persons[personIndex].lastAction[3] == newBus.nr):
+                        # The person can board the bus! So we mark it to know when we finish
+                        # to add/move all buses at the time
+                        # print(f"Autobuz nou, persoana nebanata in statie {personName} => POSIBILA STARE")
+
+                        updatedPerson = copy(current.persons[personIndex])
+                        updatedPerson.status = "travelling"
+                        updatedPerson.budget -= newBus.ticketPrice
+                        # The banned buses for the person are reset
+                        # and we mark the bus they're boarding, so they won't try
+                        # to get back up the one they got down from
+                        updatedPerson.banned = {}
+                        updatedPerson.bus = (newBus.nr, newBus.leaveTime, newBus.type)
+                        if updatedPerson.waitingTime + updatedPerson.travelTime != time:
+                            updatedPerson.waitingTime += (time - lastTime)
+                        updatedBus = newBus.replace(person=updatedPerson.name)
+                        updatedPerson.lastAction = ("up", newBus.currentStation, time, newBus.nr)
+                        possibleActions.append(["up", updatedPerson, updatedBus])
+
+                        # Now we have to ban the bus for the actual person we have
+                        # because we generated an action of them boarding this type of bus
+                        current.persons[personIndex] = current.persons[personIndex].replace(
+                            banned={**current.persons[personIndex].banned, (newBus.nr, newBus.type): time})
+                        copies += 3
+                # If there's no person in station or the person can't get on the bus
+                # no action is left
 
             # Finished adding buses
             # Checking if there's any buses that are moving!
 
-            busIndex = 0
-            while busIndex < len(current.buses):
-                if current.buses[busIndex].move(time):
+            # Only the buses the schedule places in a station at this time move, in the order they are on route
+            for busKey in self.timetable.movesAt(time):
+                busIndex = current.getBus(*busKey)
+                if busIndex is not None:
+                    movedBus = current.buses[busIndex].movedAt(time)
+                    if movedBus is not current.buses[busIndex]:
+                        copies += 1
+                    current.buses[busIndex] = movedBus
                     # The bus reaches it's next station, move the person if there's one
-                    # Add the next possible time, we know it will reach the next destination in travelTime minutes
-
-                    if current.buses[busIndex].travelTime + time not in nextTimes:
-                        nextTimes.append(current.buses[busIndex].travelTime + time)
 
                     if current.buses[busIndex].person is not None:
                         personIndex = current.getPerson(current.buses[busIndex].person)
-                        if not current.persons[personIndex].moveAt(current.buses[busIndex].currentStation):
+                        movedPerson = copy(current.persons[personIndex])
+                        copies += 1
+                        if not movedPerson.moveAt(current.buses[busIndex].currentStation):
                             print("Something went wrong. Person should have been travelling")
                             exit()
+                        current.persons[personIndex] = movedPerson
 
                         # Now that the person moved, we check if they can get down the bus at this station
                         if current.getPersonWaitingAt(current.buses[busIndex].currentStation) is None:
@@ -787,7 +1456,7 @@ class Graph:
                                     current.persons[personIndex].location) \
                                     and not (current.action == "finished" and current.person.location == \
                                              current.persons[personIndex].location):
-                                updatedPerson = deepcopy(current.persons[personIndex])
+                                updatedPerson = copy(current.persons[personIndex])
                                 updatedPerson.status = "waiting"
                                 updatedPerson.bus = None
                                 if updatedPerson.destinations[updatedPerson.visited + 1] == updatedPerson.location:
@@ -795,12 +1464,12 @@ class Graph:
                                     updatedPerson.visited += 1
                                 updatedPerson.lastAction = (
                                 "down", current.buses[busIndex].currentStation, time, current.buses[busIndex].nr)
-                                updatedBus = deepcopy(current.buses[busIndex])
-                                updatedBus.person = None
+                                updatedBus = current.buses[busIndex].replace(person=None)
+                                copies += 2  # The person getting down and the bus
                                 # Mark the bus as banned, so the person won't go down and then get up
                                 # the same bus
-                                updatedPerson.banned.update(
-                                    {(current.buses[busIndex].nr, current.buses[busIndex].type): time})
+                                updatedPerson.banned = {**updatedPerson.banned,
+                                                        (current.buses[busIndex].nr, current.buses[busIndex].type): time}
                                 if updatedPerson.waitingTime + updatedPerson.travelTime != time:
                                     updatedPerson.travelTime += (time - lastTime)
                                 if updatedPerson.visited == updatedPerson.nr_destinations - 1:
@@ -813,9 +1482,7 @@ class Graph:
                             if current.buses[busIndex].currentStation == current.buses[busIndex].route[-1]:
                                 # Break the generating. We don't want the person to disappear along with the bus
                                 # print(f"Bus {(current.buses[busIndex].nr, current.buses[busIndex].leaveTime, current.buses[busIndex].type)} dispare")
-                                indexBusSchema = current.getBusSchema(current.buses[busIndex].nr)
-                                current.buses.pop(busIndex)
-                                current.busSchemas[indexBusSchema].nrDisappearedBuses += 1
+                                current.removeBus(busIndex)
                                 breakFlag = True  # So we know we stop everything
                                 break
                         elif current.buses[busIndex].currentStation == current.buses[busIndex].route[-1]:
@@ -838,13 +1505,11 @@ class Graph:
                                 personIndex = current.getPerson(personName)
                                 if (current.buses[busIndex].nr, current.buses[busIndex].type) not in \
                                         current.persons[personIndex].banned.keys():
-                                    current.persons[personIndex].banned.update({(
-                                                                                    current.buses[busIndex].nr,
-                                                                                    current.buses[
-                                                                                        busIndex].type): time})
-                            indexBusSchema = current.getBusSchema(current.buses[busIndex].nr)
-                            current.buses.pop(busIndex)
-                            current.busSchemas[indexBusSchema].nrDisappearedBuses += 1
+                                    current.persons[personIndex] = current.persons[personIndex].replace(
+                                        banned={**current.persons[personIndex].banned,
+                                                (current.buses[busIndex].nr, current.buses[busIndex].type): time})
+                                    copies += 1
+                            current.removeBus(busIndex)
 
                             continue  # Go to the next bus
 
@@ -861,7 +1526,7 @@ class Graph:
                                          current.persons[personIndex].lastAction[3] == current.buses[busIndex].nr):
 
                                 # print(f"{personName} poate sa urce => POSIBILA STARE")
-                                updatedPerson = deepcopy(current.persons[personIndex])
+                                updatedPerson = copy(current.persons[personIndex])
                                 updatedPerson.status = "travelling"
                                 updatedPerson.budget -= current.buses[busIndex].ticketPrice
                                 # The banned buses for the person are reset
@@ -872,31 +1537,37 @@ class Graph:
                                                      current.buses[busIndex].type)
                                 updatedPerson.lastAction = (
                                 "up", current.buses[busIndex].currentStation, time, current.buses[busIndex].nr)
-                                updatedBus = deepcopy(current.buses[busIndex])
-                                updatedBus.person = updatedPerson.name
+                                updatedBus = current.buses[busIndex].replace(person=updatedPerson.name)
                                 if updatedPerson.waitingTime + updatedPerson.travelTime != time:
                                     updatedPerson.waitingTime += (time - lastTime)
                                 possibleActions.append(["up", updatedPerson, updatedBus])
 
                                 # Now we have to ban the bus for the actual person we have
                                 # because we generated an action of them boarding this type of bus
-                                current.persons[personIndex].banned.update({
-                                    (current.buses[busIndex].nr, current.buses[busIndex].type): time})
+                                current.persons[personIndex] = current.persons[personIndex].replace(
+                                    banned={**current.persons[personIndex].banned,
+                                            (current.buses[busIndex].nr, current.buses[busIndex].type): time})
+                                copies += 3
                             elif (current.buses[busIndex].nr, current.buses[busIndex].type) not in \
                                     current.persons[personIndex].banned.keys():
                                 # The person didn't have money to board it. We need to ban it so won't try again
-                                current.persons[personIndex].banned.update({
-                                    (current.buses[busIndex].nr, current.buses[busIndex].type): time})
-                busIndex += 1
+                                current.persons[personIndex] = current.persons[personIndex].replace(
+                                    banned={**current.persons[personIndex].banned,
+                                            (current.buses[busIndex].nr, current.buses[busIndex].type): time})
+                                copies += 1
 
             # Finished moving everything
 
             # Updating the persons waiting time/travelling time
-            for personIndex in range(len(current.persons)):
-                if current.persons[personIndex].status == "waiting":
-                    current.persons[personIndex].waitingTime += (time - lastTime)
-                else:
-                    current.persons[personIndex].travelTime += (time - lastTime)
+            if time != lastTime:
+                for personIndex in range(len(current.persons)):
+                    person = current.persons[personIndex]
+                    if person.status == "waiting":
+                        person = person.replace(waitingTime=person.waitingTime + (time - lastTime))
+                    else:
+                        person = person.replace(travelTime=person.travelTime + (time - lastTime))
+                    current.persons[personIndex] = person
+                copies += len(current.persons)
 
             # We see what actions took place, and update
             for actionIndex in range(len(possibleActions)):
@@ -910,10 +1581,11 @@ class Graph:
                     # We need to add the cost
                     moneyCost += possibleActions[actionIndex][2].ticketPrice
                     moveCost += possibleActions[actionIndex][2].ticketPrice
-                newPersons = deepcopy(current.persons)
-                newBuses = deepcopy(current.buses)
-                moveCost += (time - nodCurent.info.time) * len(newPersons)
-                timeCost += (time - nodCurent.info.time) * len(newPersons)
+                # Only the person and the bus of the action are new, the rest are shared with current
+                newPersons = list(current.persons)
+                newBuses = list(current.buses)
+                moveCost += (time - info.time) * len(newPersons)
+                timeCost += (time - info.time) * len(newPersons)
                 # Update the person in the list
                 personIndex = current.getPerson(possibleActions[actionIndex][1].name)
                 if personIndex is None:
@@ -930,37 +1602,163 @@ class Graph:
                 elif busIndex is not None:
                     newBuses[busIndex] = possibleActions[actionIndex][2]
 
-                possibleNodeInfo = Information(deepcopy(current.busSchemas), newPersons, newBuses, time, \
-                                               action=possibleActions[actionIndex][0], nextTimes=deepcopy(nextTimes),
+                possibleNodeInfo = Information(current.busSchemas, newPersons, newBuses, time, \
+                                               action=possibleActions[actionIndex][0],
                                                person=possibleActions[actionIndex][1],
-                                               bus=possibleActions[actionIndex][2])
-                possibleNode = Node(possibleNodeInfo, nodCurent, moveCost + nodCurent.cost,
-                                    self.calculeaza_h(possibleNodeInfo, tip_euristica),
-                                    timeCost, moneyCost, self.startTime)
-
-                if not nodCurent.isInPath(possibleNode):
-                    listaSuccesori.append(possibleNode)
+                                               bus=possibleActions[actionIndex][2],
+                                               departedUntil=current.departedUntil, stations=current.stations)
+                possibleStates.append((possibleNodeInfo, moveCost, timeCost, moneyCost))
+
+            if instrumentation is not None:
+                instrumentation.stop("genereazaSuccesori", started)
+                instrumentation.copies += copies
+                started = instrumentation.start()
+            copies = 0
+            # The heuristic can be calculated for all the successors of this time step at once
+            if 0 < self.batchHeuristicMinimum <= len(possibleStates) and loadNumpy() is not None:
+                hValues = self.calculeaza_h_batch([state[0] for state in possibleStates], tip_euristica).tolist()
+            else:
+                hValues = [self.calculeaza_h(state[0], tip_euristica) for state in possibleStates]
+            if instrumentation is not None:
+                instrumentation.stop("calculeaza_h", started)
+            for (possibleNodeInfo, moveCost, timeCost, moneyCost), h in zip(possibleStates, hValues):
+                yield possibleNodeInfo, moveCost, timeCost, moneyCost, h
+            possibleStates = []
+            if instrumentation is not None:
+                started = instrumentation.start()
 
             if breakFlag:  # need to end the execution!
                 break
             # Move to the next time
-            if len(nextTimes) == 0:  # There's no action that can take place
+            # Because every action can take place only at appearance of buses or when buses reach
+            # a new station, the next time is the next event in the schedule
+            nextTime = self.timetable.nextTime(time)
+            if nextTime is None:  # There's no action that can take place
                 break
 
-            nextTimes.sort()
             lastTime = time
-            time = nextTimes[0]
-            nextTimes = nextTimes[1:]
+            time = nextTime
 
-        # Finished seeing all possible actions that could happen
-        return listaSuccesori
+        # Only the expansions whose successors were all generated get here
+        if instrumentation is not None:
+            instrumentation.stop("genereazaSuccesori", started)
+            instrumentation.copies += copies
+            instrumentation.distributions["timeSteps"][steps] += 1
+
+    def heuristicKey(self, infoNod, tip_euristica):
+        """Builds the part of a state the heuristic depends on
+
+        Note:
+            Only the location, the visited destinations and the status of every person are used. "euristica admisibila
+            4" also needs the bus of a travelling person and the time, to know where the bus is in between stations.
+
+        :param infoNod: state checked
+        :param tip_euristica: type of heuristic
+        :return: hashable tuple
+        """
+        if tip_euristica == "euristica admisibila 4":
+            return tip_euristica, infoNod.time, tuple((person.name, person.location, person.visited, person.status,
+                                                       person.bus) for person in infoNod.persons)
+        return tip_euristica, tuple((person.name, person.location, person.visited, person.status)
+                                    for person in infoNod.persons)
 
     def calculeaza_h(self, infoNod, tip_euristica="euristica banala"):
+        """Calculates an heuristic, the cost of the state reaching final state, using the cache if possible
+
+        :param infoNod: state checked
+        :param tip_euristica: string of type, either "euristica banala", "euristica admisbila 1", "euristica admisibila 2",
+         "euristica admisibila 3", "euristica admisibila 4", "euristica neadmisibila"
+        :return: int, the supposed cost
+        """
+        if self.heuristicCacheSize == 0:
+            return self.computeHeuristic(infoNod, tip_euristica)
+        key = self.heuristicKey(infoNod, tip_euristica)
+        h = self.heuristicCache.get(key)
+        if h is not None:
+            self.heuristicCache.move_to_end(key)
+            self.heuristicHits += 1
+            return h
+        self.heuristicMisses += 1
+        h = self.computeHeuristic(infoNod, tip_euristica)
+        self.heuristicCache[key] = h
+        if len(self.heuristicCache) > self.heuristicCacheSize:
+            self.heuristicCache.popitem(last=False)  # Drop the least recently used value
+        return h
+
+    def personArrays(self, infos, tip_euristica):
+        """Puts the persons of a batch of states in a struct of arrays, one entry for every person of every state
+
+        Note:
+            Only the arrays the heuristic needs are built. The positions of the buses and the destinations are only
+            needed by "euristica admisibila 4".
+
+        :param infos: list of Information
+        :param tip_euristica: type of heuristic
+        :return: dict name -> numpy array
+        """
+        persons = [person for info in infos for person in info.persons]
+        nrPersons = [len(info.persons) for info in infos]
+        count = len(persons)
+        batch = {"owner": numpy.repeat(numpy.arange(len(infos)), nrPersons),  # Index of the state in infos
+                 "remainingDestinations": numpy.fromiter((person.nr_destinations - person.visited
+                                                          for person in persons), numpy.int64, count),
+                 "waiting": numpy.fromiter((person.status == "waiting" for person in persons), bool, count)}
+        if tip_euristica == "euristica admisibila 4":
+            arrays = self.distances.buildArrays()
+            offsets, routeIds = arrays["offsets"], arrays["routeIds"]
+            batch["location"] = numpy.fromiter((person.location for person in persons), numpy.int64, count)
+            batch["destinationIndex"] = numpy.fromiter((offsets[person.name] + person.visited + 1
+                                                        for person in persons), numpy.int64, count)
+            batch["time"] = numpy.repeat(numpy.array([info.time for info in infos], dtype=float), nrPersons)
+            # Waiting persons get the first route, their values are not used
+            batch["routeId"] = numpy.fromiter((routeIds[(person.bus[0], person.bus[2])] if person.bus is not None
+                                               else 0 for person in persons), numpy.int64, count)
+            batch["leaveTime"] = numpy.fromiter((person.bus[1] if person.bus is not None else 0
+                                                 for person in persons), float, count)
+        return batch
+
+    def calculeaza_h_batch(self, infos, tip_euristica="euristica banala"):
+        """Calculates an heuristic for a batch of states at once, with NumPy
+
+        Note:
+            Gives the same values as calculeaza_h, the persons of all the states are evaluated together, then the
+            values are added up (or the maximum is taken) for every state.
+
+        :param infos: list of Information, usually all the successors of one node
+        :param tip_euristica: type of heuristic, same as for calculeaza_h
+        :return: numpy array of float, the supposed cost of every state
+        """
+        if loadNumpy() is None:
+            raise ImportError("NumPy is needed to calculate the heuristic for a batch of states")
+        batch = self.personArrays(infos, tip_euristica)
+        owner = batch["owner"]
+        nrStates = len(infos)
+        nrPersons = numpy.bincount(owner, minlength=nrStates)
+        maxDestinations = numpy.zeros(nrStates, dtype=numpy.int64)
+        numpy.maximum.at(maxDestinations, owner, batch["remainingDestinations"])
+        if tip_euristica == "euristica banala":
+            notFinished = numpy.bincount(owner, weights=batch["remainingDestinations"] != 1, minlength=nrStates)
+            return (notFinished > 0).astype(float)
+        elif tip_euristica == "euristica admisibila 1":
+            perPerson = numpy.where(batch["waiting"], self.minimumTicketPrice + self.minimumTravelTime, 0)
+            return numpy.bincount(owner, weights=perPerson, minlength=nrStates)
+        elif tip_euristica == "euristica admisibila 2":
+            return maxDestinations * float(self.minimumTravelTime)
+        elif tip_euristica == "euristica admisibila 3":
+            waitingPersons = numpy.bincount(owner, weights=batch["waiting"], minlength=nrStates)
+            return maxDestinations * float(self.minimumTravelTime) + waitingPersons * self.minimumTicketPrice
+        elif tip_euristica == "euristica neadmisibila":
+            return nrPersons * maxDestinations * float(self.maxTravelTime) + nrPersons * float(self.maxTicketPrice)
+        elif tip_euristica == "euristica admisibila 4":
+            return numpy.bincount(owner, weights=self.distances.personBounds(batch), minlength=nrStates)
+        raise ValueError(f"Unknown heuristic {tip_euristica}")
+
+    def computeHeuristic(self, infoNod, tip_euristica="euristica banala"):
         """Calculates an heuristic, the cost of the state reaching final state
 
         :param infoNod: state checked
         :param tip_euristica: string of type, either "euristica banala", "euristica admisbila 1", "euristica admisibila 2",
-         "euristica neadmisibila"
+         "euristica admisibila 3", "euristica admisibila 4", "euristica neadmisibila"
         :return: int, the supposed cost
         """
         if tip_euristica == "euristica banala":
@@ -975,7 +1773,7 @@ class Graph:
             h = 0
             for personIndex in range(len(infoNod.persons)):
                 if infoNod.persons[personIndex].status == "waiting":  # Assume they get on the cheapest bus
-                    h += infoNod.minimumTicketPrice + infoNod.minimumTravelTime
+                    h += self.minimumTicketPrice + self.minimumTravelTime
             return h
         elif tip_euristica == "euristica admisibila 2":
             # Assuming that the person with the most destinations travels with the bus
@@ -988,7 +1786,7 @@ class Graph:
                 max_destinations = 0
             else:
                 max_destinations = max(max_destinations)
-            h = max_destinations * infoNod.minimumTravelTime
+            h = max_destinations * self.minimumTravelTime
             return h
         elif tip_euristica == "euristica admisibila 3":
             max_destinations = [infoNod.persons[personIndex].nr_destinations - infoNod.persons[personIndex].visited \
@@ -997,31 +1795,28 @@ class Graph:
                 max_destinations = 0
             else:
                 max_destinations = max(max_destinations)
-            h = max_destinations * infoNod.minimumTravelTime
+            h = max_destinations * self.minimumTravelTime
             for personIndex in range(len(infoNod.persons)):
                 if infoNod.persons[personIndex].status == "waiting":  # Assume they get on the cheapest bus
-                    h += infoNod.minimumTicketPrice
+                    h += self.minimumTicketPrice
             return h
         elif tip_euristica == "euristica neadmisibila":
             # Assuming every person takes for every remaining destination a new bus, the one with the maximum
             # ticket price
-            maxTicketPrice = [busSchema.ticketPrice for busSchema in infoNod.busSchemas]
             max_destinations = [infoNod.persons[personIndex].nr_destinations - infoNod.persons[personIndex].visited \
                                 for personIndex in range(len(infoNod.persons))]
-            maxTravelTime = [busSchema.travelTime for busSchema in infoNod.busSchemas]
             if len(max_destinations) == 0:
                 max_destinations = 0
             else:
                 max_destinations = max(max_destinations)
-            if len(maxTicketPrice) == 0:
-                maxTicketPrice = 0
-            else:
-                maxTicketPrice = max(maxTicketPrice)
-            if len(maxTravelTime) == 0:
-                maxTravelTime = 0
-            else:
-                maxTravelTime = max(maxTravelTime)
-            h = len(infoNod.persons) * max_destinations * maxTravelTime + len(infoNod.persons) * maxTicketPrice
+            h = len(infoNod.persons) * max_destinations * self.maxTravelTime + len(infoNod.persons) * self.maxTicketPrice
+            return h
+        elif tip_euristica == "euristica admisibila 4":
+            # Every person has to reach their remaining destinations in order, each at least in the minimum time
+            # and with the minimum fare in between the stations, and the costs of the persons add up
+            h = 0
+            for person in infoNod.persons:
+                h += self.distances.personBound(person, infoNod.time)
             return h
 
     def __repr__(self):
@@ -1031,269 +1826,841 @@ class Graph:
         return (sir)
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
-def breadth_first(gr, nrSolutiiCautate, tip_euristica):
-    startTime = time.time()
-    c = [Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)]
+class OpenList:
+    """Priority queue for the open list of the A* algorithms, backed by a binary heap
 
-    solutions = []
-    maxNodesMemory = 0
-    nodesCalculated = 0
+    Note:
+        Nodes are ordered by f (cost + weight * h, when a weight is given). When tieBreakCost is True, for equal f the
+        node with the bigger cost comes first. For remaining ties the node added last comes first, the same order the
+        sorted list insertion used to give.
+        Removing a node only marks its entry (lazy deletion), it is discarded when it reaches the top of the heap.
+    """
+
+    def __init__(self, tieBreakCost=False, weight=1):
+        """__init__
+
+        :param tieBreakCost: True if for equal f the node with the bigger cost should be expanded first
+        :param weight: the weight of the heuristic in f, 1 for A*
+        """
+        self.tieBreakCost = tieBreakCost
+        self.weight = weight
+        self.heap = []  # Entries [f, -cost, -counter, node], node is None for removed entries
+        self.entries = {}  # Node -> its entry in the heap
+        self.counter = itertools.count()
+
+    def push(self, node):
+        """Adds a node in the open list
+
+        :param node: Node
+        """
+        f = node.f if self.weight == 1 else node.cost + self.weight * node.h
+        entry = [f, -node.cost if self.tieBreakCost else 0, -next(self.counter), node]
+        self.entries[node] = entry
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """Removes and returns the node with the minimum f
+
+        :return: Node or None if the open list is empty
+        """
+        while self.heap:
+            node = heapq.heappop(self.heap)[-1]
+            if node is not None:
+                del self.entries[node]
+                return node
+        return None
+
+    def peek(self):
+        """Returns the node with the minimum f, without removing it
+
+        :return: Node or None if the open list is empty
+        """
+        while self.heap:
+            if self.heap[0][-1] is not None:
+                return self.heap[0][-1]
+            heapq.heappop(self.heap)
+        return None
+
+    def remove(self, node):
+        """Removes the node provided (decrease-key is a remove followed by a push)
+
+        :param node: Node that is in the open list
+        """
+        entry = self.entries.pop(node)
+        entry[-1] = None
+
+    def __iter__(self):
+        return iter(list(self.entries.keys()))
+
+    def __contains__(self, node):
+        return node in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TableEntry:
+    """What a TranspositionTable knows about one state
+    """
+    __slots__ = ("cost", "limit", "bound", "successors")
+
+    def __init__(self):
+        self.cost = None  # Cost of the last node of the state whose subtree was searched without finding solutions
+        self.limit = None  # Limit of that search, f for ida_star, (iteration, depth left) for depth_first_iterativ
+        self.bound = None  # Minimum f over the limit found in that search, for ida_star
+        self.successors = None  # List of what Graph.genereazaStari gives for this state, None if not known yet
+
+    def record(self, states):
+        """Gives the states provided, keeping them as the successors once all of them were given
+
+        :param states: generator of Graph.genereazaStari
+        :return: generator of the same tuples
+        """
+        successors = []
+        for state in states:
+            successors.append(state)
+            yield state
+        self.successors = successors
+
+
+class TranspositionTable:
+    """Bounded table generation key -> TableEntry, kept across the iterations of ida_star and depth_first_iterativ
+
+    Note:
+        The entries keep the successors of the states, so an iteration doesn't simulate again the states the previous
+        ones expanded. At most maxEntries states are kept, when a new one is added the least recently used one is
+        evicted. The successors keep their Information alive, so maxEntries limits the memory used.
+    """
+
+    def __init__(self, maxEntries):
+        """__init__
+
+        :param maxEntries: maximum number of states kept
+        """
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.reused = 0  # Expansions whose successors were taken from the table
+        self.pruned = 0  # Subtrees that weren't searched again
+        self.evicted = 0  # States removed to make room for new ones
+
+    def entry(self, key):
+        """Gets the entry of a state, adding an empty one if the state isn't in the table
+
+        :param key: generation key, Information.generationKey()
+        :return: TableEntry
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if entry.successors is not None:
+                self.reused += 1
+            return entry
+        entry = TableEntry()
+        self.entries[key] = entry
+        if len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+        return entry
+
+    def addStats(self, solution):
+        """Adds the counters of the table to the statistics of a solution
+
+        :param solution: Solution
+        """
+        solution.stats["tableReused"] = self.reused
+        solution.stats["tablePruned"] = self.pruned
+        solution.stats["tableEvicted"] = self.evicted
+
+
+class SmaEntry:
+    """Node of the search tree kept in memory by sma_star"""
+    __slots__ = ("node", "key", "parent", "f", "children", "pending", "forgotten", "expanded", "version")
+
+    def __init__(self, node, parent, f):
+        """__init__
+
+        :param node: Node
+        :param parent: SmaEntry of the parent, None for the root
+        :param f: f of the node, at least the f of the parent
+        """
+        self.node = node
+        self.key = node.info.generationKey()
+        self.parent = parent
+        self.f = f
+        self.children = []  # Entries of the successors in memory
+        self.pending = None  # Successors still to be added in memory, None until they are (re)generated
+        self.forgotten = {}  # Generation key -> f of the successors removed from memory
+        self.expanded = False  # True once every successor was added in memory
+        self.version = 0  # Changed with every change of the node, the heap entries with another version are stale
+
+
+class SmaTree:
+    """The search tree of sma_star, with at most maxNodes nodes in memory
+
+    Note:
+        The queue has the nodes with successors that aren't in memory. Two heaps with lazy deletion give the deepest
+        node with the minimum f, the next one expanded, and the shallowest leaf with the maximum f, the next one
+        removed when the memory is full. A node removed from memory is forgotten by its parent, which keeps its f and
+        generates it again if it becomes the best node. The f of an expanded node is the minimum f of its successors,
+        in memory or forgotten, so it is backed up to the ancestors. The successors generated and not added yet
+        count against maxNodes too.
+    """
+
+    def __init__(self, root, maxNodes):
+        """__init__
+
+        :param root: SmaEntry of the start node
+        :param maxNodes: maximum number of nodes in memory
+        """
+        self.root = root
+        self.maxNodes = maxNodes
+        self.size = 1  # Nodes in memory, in the tree or waiting to be added to it
+        self.evicted = 0
+        self.counter = itertools.count()
+        self.best = []  # Entries (f, -depth, -counter, version, SmaEntry)
+        self.worst = []  # Entries (-f, depth, counter, version, SmaEntry)
+        self.update(root)
+
+    def update(self, entry):
+        """Adds again in the heaps a node that changed
+
+        :param entry: SmaEntry
+        """
+        entry.version += 1
+        if entry.pending is None or len(entry.pending) > 0:
+            heapq.heappush(self.best, (entry.f, -entry.node.depth, -next(self.counter), entry.version, entry))
+        if len(entry.children) == 0 and entry is not self.root:
+            heapq.heappush(self.worst, (-entry.f, entry.node.depth, next(self.counter), entry.version, entry))
+        # The stale heap entries are dropped once they are most of the heap, so they don't grow without limit
+        for heap in (self.best, self.worst):
+            if len(heap) > 4 * self.maxNodes:
+                heap[:] = [item for item in heap if item[3] == item[-1].version]
+                heapq.heapify(heap)
+
+    def nextNode(self):
+        """
+        :return: the deepest SmaEntry with the minimum f in the queue or None if the queue is empty
+        """
+        while self.best:
+            if self.best[0][3] == self.best[0][-1].version:
+                return self.best[0][-1]
+            heapq.heappop(self.best)
+        return None
+
+    def add(self, parent, node, f):
+        """Adds to the tree a successor from the pending ones of its parent, already counted in size
+
+        :param parent: SmaEntry
+        :param node: Node
+        :param f: f of the successor
+        """
+        entry = SmaEntry(node, parent, f)
+        parent.children.append(entry)
+        parent.forgotten.pop(entry.key, None)
+        self.update(parent)
+        self.update(entry)
+
+    def evict(self, keep):
+        """Removes from memory the shallowest leaf with the maximum f
+
+        :param keep: SmaEntry that isn't removed, the node being expanded
+        :return: True if a leaf was removed, False if there's no leaf besides keep
+        """
+        skipped = []
+        removed = False
+        while self.worst and not removed:
+            item = heapq.heappop(self.worst)
+            version, worst = item[3:]
+            if version != worst.version:
+                continue
+            if worst is keep:
+                skipped.append(item)
+                continue
+            self.evicted += 1
+            self.forget(worst)
+            removed = True
+        for item in skipped:
+            heapq.heappush(self.worst, item)
+        return removed
+
+    def forget(self, entry):
+        """Removes a node from memory, its parent keeps its f
+
+        :param entry: SmaEntry that isn't the root and has no successors in memory
+        """
+        entry.version += 1  # Its heap entries are stale
+        parent = entry.parent
+        parent.children.remove(entry)
+        parent.forgotten[entry.key] = entry.f
+        self.size -= 1 + len(entry.pending or [])
+        entry.node = None  # The stale heap entries keep the SmaEntry, not its node
+        entry.pending = None
+        self.refresh(parent)
+
+    def refresh(self, entry):
+        """Backs up the f of an expanded node, and of its ancestors, from its successors
+
+        Note:
+            An expanded node with forgotten successors goes back in the queue, to generate them again. One whose
+            successors can't reach a solution (f infinite) is removed from memory too
+
+        :param entry: SmaEntry
+        """
+        while entry is not None:
+            if not entry.expanded or (entry.pending is not None and len(entry.pending) > 0):
+                self.update(entry)
+                return
+            f = min([child.f for child in entry.children] + list(entry.forgotten.values()), default=float('inf'))
+            f = max(entry.f, f)
+            entry.pending = None if any(value < float('inf') for value in entry.forgotten.values()) else []
+            if f == float('inf') and len(entry.children) == 0 and entry is not self.root:
+                entry.f = f
+                self.forget(entry)  # Dead end
+                return
+            changed = f != entry.f
+            entry.f = f
+            self.update(entry)
+            if not changed:
+                return
+            entry = entry.parent
+
+
+class DominanceIndex:
+    """Pareto fronts of the states with the same progress, used by a_star_optimizat to reject dominated states
+
+    Note:
+        Two states with the same progress key (the generation key without the budgets and the time spent) can make
+        the same moves, except for the tickets a person can't afford anymore. A state
+        with a cost (time and money spent) no greater and every budget at least as big as another one dominates it:
+        anything reachable from the dominated state is reachable from it at no greater cost.
+    """
+
+    def __init__(self):
+        self.fronts = {}  # Progress key -> list of (cost, budgets), none dominating another
+        self.pruned = 0
+
+    def dominated(self, node):
+        """Checks if a state seen before dominates the node, otherwise adds the node to the front of its key
+
+        :param node: Node
+        :return: True if the node is dominated, False otherwise
+        """
+        key, budgets = node.info.progressKey()
+        front = self.fronts.get(key)
+        if front is None:
+            self.fronts[key] = [(node.cost, budgets)]
+            return False
+        for cost, otherBudgets in front:
+            if cost <= node.cost and all(other >= budget for other, budget in zip(otherBudgets, budgets)):
+                self.pruned += 1
+                return True
+        # The states the node dominates leave the front
+        front[:] = [(cost, otherBudgets) for cost, otherBudgets in front
+                    if not (node.cost <= cost and all(budget >= other for budget, other in zip(budgets, otherBudgets)))]
+        front.append((node.cost, budgets))
+        return False
+
+
+def breadth_first(gr, nrSolutiiCautate, tip_euristica):
+    startTime = time.time()
+    c = [Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)]
+
+    maxNodesMemory = 0
+    nodesCalculated = 0
 
     while len(c) > 0:
         nodCurent = c.pop(0)
 
         if gr.isFinal(nodCurent):
-            nrNodes, string = nodCurent.pathString()
-            solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                                f"Costul drumului este: {str(nodCurent.cost)}\n"])
-            solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-            solution += "Numarul maxim de noduri in memorie: " + str(maxNodesMemory) + "\n"
-            solution += "Numarul total de noduri calculate: " + str(nodesCalculated) + "\n"
-            solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-            solutions.append(solution)
+            yield Solution(nodCurent, gr, startTime, maxNodesMemory, nodesCalculated)
             nrSolutiiCautate -= 1
             if nrSolutiiCautate == 0:
-                return solutions
+                return
         lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica)
         nodesCalculated += len(lSuccesori)
         c.extend(lSuccesori)
         maxNodesMemory = max(maxNodesMemory, len(c))
-    return solutions
+        gr.reportMemory(maxNodesMemory)
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
 def depth_first(gr, nrSolutiiCautate, tip_euristica):
     startTime = time.time()
-    solutions = []
 
-    df(gr, Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime), nrSolutiiCautate,
-       tip_euristica,
-       solutions, startTime, [0, 0])
-    return solutions
+    yield from df(gr, Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime),
+                  nrSolutiiCautate, tip_euristica, startTime, [0, 0, 0])
+
 
+def df(gr, nodCurent, nrSolutiiCautate, tip_euristica, startTime, nodeInfo):
+    """Depth first search from the node provided, with an explicit stack instead of recursion
+
+    Note:
+        The stack keeps a generator of successors for every node on the path, so the nodes are visited in the same
+        order as the recursive version would and the depth isn't limited by the recursion limit
 
-def df(gr, nodCurent, nrSolutiiCautate, tip_euristica, solutions, startTime, nodeInfo):
+    :param nodeInfo: list [max nodes in memory, total nodes, max stack depth], updated during the search
+    :return: generator of the solutions found, which returns the number of solutions left to find
+    """
     if nrSolutiiCautate <= 0:
         return nrSolutiiCautate
 
-    if gr.isFinal(nodCurent):
-        nrNodes, string = nodCurent.pathString()
-        solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                            f"Costul drumului este: {str(nodCurent.cost)}\n"])
-        solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-        solution += "Numarul maxim de noduri in memorie: " + str(nodeInfo[0]) + "\n"
-        solution += "Numarul total de noduri calculate: " + str(nodeInfo[1]) + "\n"
-        solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-        solutions.append(solution)
-        nrSolutiiCautate -= 1
-        if nrSolutiiCautate == 0:
-            return nrSolutiiCautate
-    lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica)
-    nodeInfo[1] += len(lSuccesori)
-    nodeInfo[0] = max(nodeInfo[0], len(lSuccesori))
-    for sc in lSuccesori:
-        if nrSolutiiCautate != 0:
-            nrSolutiiCautate = df(gr, sc, nrSolutiiCautate, tip_euristica, solutions, startTime, nodeInfo)
-
-    return nrSolutiiCautate
-
-
-@stopit.threading_timeoutable(default="Stopped because of timeout")
-def dfi(gr, nodCurent, adancime, nrSolutiiCautate, tip_euristica, solutions, startTime, nodeInfo):
-    if adancime == 1 and gr.isFinal(nodCurent):
-        nrNodes, string = nodCurent.pathString()
-        solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                            f"Costul drumului este: {str(nodCurent.cost)}\n"])
-        solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-        solution += "Numarul maxim de noduri in memorie: " + str(nodeInfo[0]) + "\n"
-        solution += "Numarul total de noduri calculate: " + str(nodeInfo[1]) + "\n"
-        solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-        solutions.append(solution)
-        nrSolutiiCautate -= 1
-        if nrSolutiiCautate == 0:
+    stack = []
+    node = nodCurent
+    while True:
+        if gr.isFinal(node):
+            yield Solution(node, gr, startTime, nodeInfo[0], nodeInfo[1], nodeInfo[2])
+            nrSolutiiCautate -= 1
+            if nrSolutiiCautate == 0:
+                return nrSolutiiCautate
+        # The successors are generated only when needed, so the ones after the last solution are never built
+        stack.append(gr.genereazaSuccesoriLazy(node, tip_euristica))
+        nodeInfo[2] = max(nodeInfo[2], len(stack))
+
+        node = None
+        while len(stack) > 0 and node is None:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()  # Every successor was searched
+        if node is None:
             return nrSolutiiCautate
-    if adancime > 1:
-        lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica)
-        nodeInfo[1] += len(lSuccesori)
-        nodeInfo[0] = max(nodeInfo[0], len(lSuccesori))
+        nodeInfo[1] += 1
+        nodeInfo[0] = max(nodeInfo[0], node.depth + 1)  # Only the nodes on the path are kept
+        gr.reportMemory(nodeInfo[0])
 
-        for sc in lSuccesori:
-            if nrSolutiiCautate != 0:
-                nrSolutiiCautate = dfi(gr, sc, adancime - 1, nrSolutiiCautate, tip_euristica, solutions, startTime,
-                                       nodeInfo)
-    return nrSolutiiCautate
+
+def dfi(gr, nodCurent, adancime, nrSolutiiCautate, tip_euristica, startTime, nodeInfo, table=None):
+    """Depth limited search from the node provided, with an explicit stack instead of recursion
+
+    Note:
+        Only the final nodes at exactly adancime - 1 moves from the node provided are solutions
+
+    :param adancime: the number of nodes on the paths searched, counting the node provided
+    :param nodeInfo: list [max nodes in memory, total nodes, max stack depth], updated during the search
+    :param table: TranspositionTable kept across the iterations or None
+    :return: generator of the solutions found, which returns the number of solutions left to find
+    """
+    stack = []  # [generator of successors, depth left, table entry, limit, number of solutions left before]
+    node = nodCurent
+    while True:
+        if adancime == 1 and gr.isFinal(node):
+            solution = Solution(node, gr, startTime, nodeInfo[0], nodeInfo[1], nodeInfo[2])
+            if table is not None:
+                table.addStats(solution)
+            yield solution
+            nrSolutiiCautate -= 1
+            if nrSolutiiCautate == 0:
+                return nrSolutiiCautate
+        if adancime > 1:
+            entry = None
+            limit = (node.depth + adancime, adancime)  # The iteration and the depth left
+            if table is not None:
+                entry = table.entry(node.info.generationKey())
+            if entry is not None and entry.limit == limit:
+                # In this iteration the state was already searched with the same depth left, without solutions
+                table.pruned += 1
+            else:
+                stack.append([gr.genereazaSuccesoriLazy(node, tip_euristica, entry), adancime - 1, entry, limit,
+                              nrSolutiiCautate])
+                nodeInfo[2] = max(nodeInfo[2], len(stack))
+
+        node = None
+        while len(stack) > 0 and node is None:
+            successors, adancime, entry, limit, nrSolutions = stack[-1]
+            node = next(successors, None)
+            if node is None:
+                # Every successor was searched
+                if entry is not None and nrSolutiiCautate == nrSolutions:
+                    entry.limit = limit
+                stack.pop()
+        if node is None:
+            return nrSolutiiCautate
+        nodeInfo[1] += 1
+        nodeInfo[0] = max(nodeInfo[0], node.depth + 1)  # Only the nodes on the path are kept
+        gr.reportMemory(nodeInfo[0])
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
 def depth_first_iterativ(gr, nrSolutiiCautate, tip_euristica):
     startTime = time.time()
-    solutions = []
-    nodeInfo = [0, 0]  # maxNodesInMemory, totalNodes
+    nodeInfo = [0, 0, 0]  # maxNodesInMemory, totalNodes, maxStackDepth
+    # Kept for all the iterations, every one of them expands again the states of the previous one
+    table = TranspositionTable(gr.transpositionTableSize) if gr.transpositionTableSize != 0 else None
 
     i = 0
     while True:
         if nrSolutiiCautate == 0:
-            return solutions
-        nrSolutiiCautate = dfi(gr,
-                               Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime),
-                               i, nrSolutiiCautate, tip_euristica,
-                               solutions, startTime, nodeInfo)
+            return
+        nrSolutiiCautate = yield from dfi(gr, Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0,
+                                                   0, gr.startTime),
+                                          i, nrSolutiiCautate, tip_euristica, startTime, nodeInfo, table)
         i += 1
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
 def a_star(gr, nrSolutiiCautate, tip_euristica):
     startTime = time.time()
-    c = [Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)]
+    c = OpenList()
+    c.push(Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime))
 
-    solutions = []
     maxNodesMemory = 0
     nodesCalculated = 0
 
     while len(c) > 0:
-        nodCurent = c.pop(0)
+        nodCurent = c.pop()
 
         if gr.isFinal(nodCurent):
-            nrNodes, string = nodCurent.pathString()
-            solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                                f"Costul drumului este: {str(nodCurent.cost)}\n"])
-            solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-            solution += "Numarul maxim de noduri in memorie: " + str(maxNodesMemory) + "\n"
-            solution += "Numarul total de noduri calculate: " + str(nodesCalculated) + "\n"
-            solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-            solutions.append(solution)
+            yield Solution(nodCurent, gr, startTime, maxNodesMemory, nodesCalculated)
             nrSolutiiCautate -= 1
             if nrSolutiiCautate == 0:
-                return solutions
+                return
 
         lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica=tip_euristica)
         nodesCalculated += len(lSuccesori)
 
         for s in lSuccesori:
-            i = 0
-            gasit_loc = False
-            for i in range(len(c)):
-                if c[i].f >= s.f:
-                    gasit_loc = True
-                    break
-            if gasit_loc:
-                c.insert(i, s)
-            else:
-                c.append(s)
+            c.push(s)
         maxNodesMemory = max(maxNodesMemory, len(c))
-    return solutions  # didn't reach the nr of desired solutions
+        gr.reportMemory(maxNodesMemory)
+    # didn't reach the nr of desired solutions
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
-def a_star_optimizat(gr, tip_euristica):
+def a_star_optimizat(gr, tip_euristica, weight=1):
     startTime = time.time()
-    l_open = [Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)]
+    l_open = OpenList(tieBreakCost=True, weight=weight)
+    nodStart = Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)
+    l_open.push(nodStart)
 
-    solutions = []
     maxNodesMemory = 0
     nodesCalculated = 0
 
-    l_closed = []
+    # Both indexes map the state key to the node, so a duplicate state is found with a single lookup
+    openIndex = {nodStart.info.stateKey(): nodStart}
+    l_closed = {}
+    dominance = None
+    if gr.dominancePruning:
+        dominance = DominanceIndex()
+        dominance.dominated(nodStart)
+    instrumentation = gr.instrumentation
     while len(l_open) > 0:
-        nodCurent = l_open.pop(0)
-
-        l_closed.append(nodCurent)
+        nodCurent = l_open.pop()
+        if instrumentation is not None:
+            started = instrumentation.start()
+        key = nodCurent.info.stateKey()
+        del openIndex[key]
+
+        l_closed[key] = nodCurent
+        if instrumentation is not None:
+            instrumentation.stop("duplicateChecks", started)
         if gr.isFinal(nodCurent):
-            nrNodes, string = nodCurent.pathString()
-            solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                                f"Costul drumului este: {str(nodCurent.cost)}\n"])
-            solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-            solution += "Numarul maxim de noduri in memorie: " + str(maxNodesMemory) + "\n"
-            solution += "Numarul total de noduri calculate: " + str(nodesCalculated) + "\n"
-            solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-            solutions.append(solution)
-            return solutions
+            solution = Solution(nodCurent, gr, startTime, maxNodesMemory, nodesCalculated)
+            if dominance is not None:
+                solution.stats["dominatedPruned"] = dominance.pruned
+            if weight != 1:
+                # With a heuristic that never overestimates the cost is at most weight times the minimum cost
+                solution.stats["suboptimalityBound"] = weight if tip_euristica in gr.admissibleHeuristics else None
+            yield solution
+            return
 
         lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica=tip_euristica)
 
         nodesCalculated += len(lSuccesori)
 
         for s in lSuccesori:
-            gasitC = False
-            for nodC in l_open:
-                if s.info == nodC.info:
-                    gasitC = True
-                    if s.f >= nodC.f:
-                        lSuccesori.remove(s)
-                    else:
+            if instrumentation is not None:
+                started = instrumentation.start()
+            keep = dominance is None or not dominance.dominated(s)
+            if keep:
+                key = s.info.stateKey()
+                nodC = openIndex.get(key)
+                if nodC is not None:
+                    keep = s.f < nodC.f
+                    if keep:
                         l_open.remove(nodC)
-                    break
-            if not gasitC:
-                for nodC in l_closed:
-                    if s.info == nodC.info:
-                        if s.f >= nodC.f:
-                            lSuccesori.remove(s)
-                        else:
-                            l_closed.remove(nodC)
-                        break
-        for s in lSuccesori:
-            i = 0
-            gasit_loc = False
-            for i in range(len(l_open)):
-                if l_open[i].f > s.f or (l_open[i].f == s.f and l_open[i].cost <= s.cost):
-                    gasit_loc = True
-                    break
-            if gasit_loc:
-                l_open.insert(i, s)
-            else:
-                l_open.append(s)
+                else:
+                    nodC = l_closed.get(key)
+                    if nodC is not None:
+                        keep = s.f < nodC.f
+                        if keep:
+                            del l_closed[key]
+            if instrumentation is not None:
+                instrumentation.stop("duplicateChecks", started)
+            if keep:
+                l_open.push(s)
+                openIndex[key] = s
 
         maxNodesMemory = max(maxNodesMemory, len(l_open) + len(l_closed))
-    return solutions
+        gr.reportMemory(maxNodesMemory)
+
+
+def weighted_a_star(gr, tip_euristica):
+    """a_star_optimizat with f = g + gr.aStarWeight * h
+
+    Note:
+        The heuristic weighs more than the cost, so the search goes deeper faster and keeps fewer nodes. With a
+        heuristic in gr.admissibleHeuristics the cost of the solution is at most gr.aStarWeight times the minimum cost,
+        the other heuristics get no bound
+    """
+    yield from a_star_optimizat(gr, tip_euristica, gr.aStarWeight)
+
+
+def beam_search(gr, nrSolutiiCautate, tip_euristica):
+    """Breadth first search that keeps only the gr.beamWidth nodes with the smallest f of every level
+
+    Note:
+        The memory is bounded by the width times the number of successors of a node, but the search isn't complete
+        or optimal, the nodes left out of the beam are never searched
+    """
+    startTime = time.time()
+    level = [Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)]
+
+    maxNodesMemory = 0
+    nodesCalculated = 0
+
+    while len(level) > 0:
+        nextLevel = {}  # State key -> the node with the smallest f that reached the state
+        for nodCurent in level:
+            if gr.isFinal(nodCurent):
+                solution = Solution(nodCurent, gr, startTime, maxNodesMemory, nodesCalculated)
+                solution.stats["beamWidth"] = gr.beamWidth
+                yield solution
+                nrSolutiiCautate -= 1
+                if nrSolutiiCautate == 0:
+                    return
+                continue
+            for s in gr.genereazaSuccesoriLazy(nodCurent, tip_euristica):
+                nodesCalculated += 1
+                key = s.info.stateKey()
+                other = nextLevel.get(key)
+                if other is None or s.f < other.f:
+                    nextLevel[key] = s
+        maxNodesMemory = max(maxNodesMemory, len(level) + len(nextLevel))
+        gr.reportMemory(maxNodesMemory)
+        level = heapq.nsmallest(gr.beamWidth, nextLevel.values(), key=lambda node: node.f)
+
+
+def anytime_a_star(gr, tip_euristica):
+    """Anytime Repairing A*, gives better and better solutions until the minimum cost one or until it is stopped
+
+    Note:
+        Every iteration is a weighted A* (f = g + w * h) that starts from the open list of the previous one, with w
+        lowered by gr.anytimeWeightStep, from gr.anytimeWeight down to 1. The states reached with a smaller cost after
+        they were expanded in an iteration are kept aside and searched again only in the next one, except in the last
+        iteration, with w = 1, where they are searched again right away, so it gives a solution with minimum cost for
+        an admissible heuristic, even one that isn't consistent. The nodes whose g + h isn't smaller than the cost of
+        the best solution are dropped. Every solution better than the previous one is given as soon as its iteration
+        ends, with the weight used and, for a heuristic in gr.admissibleHeuristics, the bound of its cost (at most
+        that many times the minimum cost). The states are compared by their generation key, so a state is never dropped for another
+        one that can't make the same moves.
+    """
+    startTime = time.time()
+    weight = max(1, gr.anytimeWeight)
+    nodStart = Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)
+    l_open = OpenList(tieBreakCost=True, weight=weight)
+    l_open.push(nodStart)
+
+    maxNodesMemory = 0
+    nodesCalculated = 0
+
+    best = {nodStart.info.generationKey(): nodStart}  # Generation key -> the node with the smallest cost
+    openIndex = {nodStart.info.generationKey(): nodStart}
+    incumbent = None  # The best final node found
+    lastCost = None  # Cost of the last solution given
+    while True:
+        closed = set()
+        incons = {}  # Closed states reached again with a smaller cost, searched in the next iteration
+        while len(l_open) > 0:
+            nodCurent = l_open.peek()
+            if incumbent is not None and nodCurent.cost + weight * nodCurent.h >= incumbent.cost:
+                break  # Nothing left in this iteration can give a better solution
+            l_open.pop()
+            key = nodCurent.info.generationKey()
+            del openIndex[key]
+            closed.add(key)
+            if gr.isFinal(nodCurent):
+                if incumbent is None or nodCurent.cost < incumbent.cost:
+                    incumbent = nodCurent
+                continue
+
+            for s in gr.genereazaSuccesoriLazy(nodCurent, tip_euristica):
+                nodesCalculated += 1
+                if incumbent is not None and s.f >= incumbent.cost:
+                    continue
+                key = s.info.generationKey()
+                nodC = best.get(key)
+                if nodC is not None and s.cost >= nodC.cost:
+                    continue
+                best[key] = s
+                if key in closed and weight > 1:
+                    incons[key] = s
+                    continue
+                nodC = openIndex.get(key)
+                if nodC is not None:
+                    l_open.remove(nodC)
+                l_open.push(s)
+                openIndex[key] = s
+            maxNodesMemory = max(maxNodesMemory, len(best))
+            gr.reportMemory(maxNodesMemory)
+
+        # What is left unexpanded is the same for every weight, so the minimum g + h of it bounds the minimum cost
+        waiting = list(openIndex.values()) + list(incons.values())
+        if incumbent is not None and (lastCost is None or incumbent.cost < lastCost):
+            lastCost = incumbent.cost
+            solution = Solution(incumbent, gr, startTime, maxNodesMemory, nodesCalculated)
+            solution.stats["weight"] = weight
+            if tip_euristica not in gr.admissibleHeuristics:
+                solution.stats["suboptimalityBound"] = None
+            else:
+                lowerBound = min([node.f for node in waiting if node.f < incumbent.cost], default=incumbent.cost)
+                solution.stats["suboptimalityBound"] = min(weight, incumbent.cost / lowerBound) if lowerBound > 0 \
+                    else weight
+            yield solution
+        if weight == 1 or len(waiting) == 0:
+            return
+        weight = max(1, weight - gr.anytimeWeightStep)
+        # The open list is ordered again with the new weight, together with the states kept aside
+        l_open = OpenList(tieBreakCost=True, weight=weight)
+        openIndex = {}
+        for node in waiting:
+            if incumbent is None or node.f < incumbent.cost:
+                key = node.info.generationKey()
+                l_open.push(node)
+                openIndex[key] = node
+
+
+def sma_star(gr, tip_euristica):
+    """Simplified memory-bounded A*, keeps at most gr.smaNodeBudget nodes in memory
+
+    Note:
+        When the memory is full the shallowest leaf with the maximum f is removed and its parent remembers its f. The
+        f of a node whose successors were all generated is the minimum f of its successors, so the parent of a removed
+        subtree knows how good it was and searches it again only when it becomes the best node. The solution has
+        minimum cost (for an admissible heuristic) if the path to it fits in the memory. There's no closed list, the
+        same state can be reached on more paths. The successors of a node count against the budget from the moment
+        they are generated, so only the best ones that fit are kept and the others are forgotten like the removed
+        nodes. The maximum number of nodes in memory is the real peak, only a final node at the end of a path that
+        fills the whole memory can go over the budget.
+    """
+    startTime = time.time()
+    nodStart = Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info), 0, 0, gr.startTime)
+    tree = SmaTree(SmaEntry(nodStart, None, nodStart.f), max(2, gr.smaNodeBudget))
+
+    maxNodesMemory = 1
+    nodesCalculated = 0
+
+    while True:
+        entry = tree.nextNode()
+        if entry is None or entry.f == float('inf'):
+            return  # There's no solution with a path that fits in the memory
+        if gr.isFinal(entry.node):
+            solution = Solution(entry.node, gr, startTime, maxNodesMemory, nodesCalculated)
+            solution.stats["evicted"] = tree.evicted
+            yield solution
+            return
+
+        if entry.pending is None:
+            # The first time every successor, after that only the ones removed from memory, which keep their f.
+            # Only the best ones that fit in the memory are kept, the others are forgotten right away
+            while tree.size >= tree.maxNodes and tree.evict(entry):
+                pass
+            room = max(1, tree.maxNodes - tree.size)
+            kept = []  # Heap (-f, counter, key, Node), the worst successor kept on top
+            for s in gr.genereazaSuccesoriLazy(entry.node, tip_euristica):
+                nodesCalculated += 1
+                key = s.info.generationKey()
+                if entry.expanded and entry.forgotten.get(key, float('inf')) == float('inf'):
+                    continue  # In memory, or it can't reach a solution
+                f = max(entry.f, s.f, entry.forgotten.get(key, s.f))
+                if not (gr.isFinal(s) or s.depth < tree.maxNodes - 1):
+                    entry.forgotten[key] = float('inf')  # The path doesn't fit in the memory
+                    continue
+                heapq.heappush(kept, (-f, next(tree.counter), key, s))
+                if len(kept) > room:
+                    f, _, key, _ = heapq.heappop(kept)
+                    entry.forgotten[key] = -f
+            # The best one is taken first, from the end
+            entry.pending = [(-f, s) for f, _, _, s in sorted(kept)]
+            tree.size += len(entry.pending)
+            maxNodesMemory = max(maxNodesMemory, tree.size)
+            gr.reportMemory(maxNodesMemory)
+        if len(entry.pending) > 0:
+            f, s = entry.pending.pop()
+            tree.add(entry, s, f)
+        if entry.pending is not None and len(entry.pending) == 0:
+            entry.expanded = True
+            tree.refresh(entry)
 
 
-@stopit.threading_timeoutable(default="Stopped because of timeout")
 def ida_star(gr, nrSolutiiCautate, tip_euristica):
     startTime = time.time()
-    solutions = []
-    nodeInfo = [0, 0]
+    nodeInfo = [0, 0, 0]  # maxNodesInMemory, totalNodes, maxStackDepth
 
     nodStart = Node(gr.startNode.info, None, 0, gr.calculeaza_h(gr.startNode.info, tip_euristica), 0, 0, gr.startTime)
     limita = nodStart.f
+    # Kept for all the iterations, every one of them expands again the states of the previous one
+    table = TranspositionTable(gr.transpositionTableSize) if gr.transpositionTableSize != 0 else None
     while True:
-        nrSolutiiCautate, rez = construieste_drum(gr, nodStart, limita, nrSolutiiCautate, tip_euristica, solutions,
-                                                  startTime, nodeInfo)
+        nrSolutiiCautate, rez = yield from construieste_drum(gr, nodStart, limita, nrSolutiiCautate, tip_euristica,
+                                                             startTime, nodeInfo, table)
         if rez == "gata":
             break
         if rez == float('inf'):
             break
         limita = rez
-    return solutions
-
-
-def construieste_drum(gr, nodCurent, limita, nrSolutiiCautate, tip_euristica, solutions, startTime, nodeInfo):
-    if nodCurent.f > limita:
-        return nrSolutiiCautate, nodCurent.f
-    if gr.isFinal(nodCurent):
-        nrNodes, string = nodCurent.pathString()
-        solution = "".join(["Solutie: \n", string, f"Lungimea drumului este: {str(nrNodes - 1)} \n",
-                            f"Costul drumului este: {str(nodCurent.cost)}\n"])
-        solution.join(f"Lungimea drumului este: {str(nrNodes)} \n")
-        solution += "Numarul maxim de noduri in memorie: " + str(nodeInfo[0]) + "\n"
-        solution += "Numarul total de noduri calculate: " + str(nodeInfo[1]) + "\n"
-        solution += "Solutia a fost gasita in " + str(time.time() - startTime) + "\n"
-        solutions.append(solution)
-        nrSolutiiCautate -= 1
-        if nrSolutiiCautate == 0:
-            return 0, "gata"
-    lSuccesori = gr.genereazaSuccesori(nodCurent, tip_euristica)
-    nodeInfo[1] += len(lSuccesori)
-    nodeInfo[0] = max(nodeInfo[0], len(lSuccesori))
-    minim = float('inf')
-    for s in lSuccesori:
-        nrSolutiiCautate, rez = construieste_drum(gr, s, limita, nrSolutiiCautate, tip_euristica, solutions, startTime,
-                                                  nodeInfo)
-        if rez == "gata":
-            return 0, "gata"
-        if rez < minim:
-            minim = rez
-    return nrSolutiiCautate, minim
+
+
+def construieste_drum(gr, nodCurent, limita, nrSolutiiCautate, tip_euristica, startTime, nodeInfo, table=None):
+    """One iteration of IDA*, searches the nodes with f at most limita, with an explicit stack instead of recursion
+
+    :param limita: the maximum f of the nodes searched
+    :param nodeInfo: list [max nodes in memory, total nodes, max stack depth], updated during the search
+    :param table: TranspositionTable kept across the iterations or None
+    :return: generator of the solutions found, which returns a tuple (number of solutions left, "gata" if all
+     solutions were found, otherwise the minimum f over limita, the limit of the next iteration)
+    """
+    stack = []  # [node, generator of successors, table entry, number of solutions left before, minimum f over limita]
+    node = nodCurent
+    while True:
+        rez = None  # The result of node, if it isn't searched
+        if node.f > limita:
+            rez = node.f
+        else:
+            if gr.isFinal(node):
+                solution = Solution(node, gr, startTime, nodeInfo[0], nodeInfo[1], nodeInfo[2])
+                if table is not None:
+                    table.addStats(solution)
+                yield solution
+                nrSolutiiCautate -= 1
+                if nrSolutiiCautate == 0:
+                    return 0, "gata"
+            entry = None
+            if table is not None:
+                entry = table.entry(node.info.generationKey())
+            if entry is not None and entry.cost == node.cost and entry.limit is not None and \
+                    (entry.limit == limita or entry.bound > limita):
+                # The state was searched before from a node with the same cost, without solutions, and either it was
+                # in this iteration or everything under it is still over the limit. The result is the same
+                table.pruned += 1
+                rez = entry.bound
+            else:
+                stack.append([node, gr.genereazaSuccesoriLazy(node, tip_euristica, entry), entry, nrSolutiiCautate,
+                              float('inf')])
+                nodeInfo[2] = max(nodeInfo[2], len(stack))
+
+        node = None
+        while len(stack) > 0 and node is None:
+            if rez is not None and rez < stack[-1][4]:
+                stack[-1][4] = rez  # The minimum of the successors
+            rez = None
+            parent, successors, entry, nrSolutions, minim = stack[-1]
+            node = next(successors, None)
+            if node is None:
+                # Every successor was searched, the result goes to the parent
+                if entry is not None and nrSolutiiCautate == nrSolutions:
+                    entry.cost, entry.limit, entry.bound = parent.cost, limita, minim
+                stack.pop()
+                rez = minim
+        if node is None:
+            return nrSolutiiCautate, rez
+        nodeInfo[1] += 1
+        nodeInfo[0] = max(nodeInfo[0], node.depth + 1)  # Only the nodes on the path are kept
+        gr.reportMemory(nodeInfo[0])
 
 
 def transformInput(file):
@@ -1304,6 +2671,7 @@ def transformInput(file):
         endTime = line.split()[1]
         busSchemas = []
         persons = []
+        stationIds = {}  # Station name -> id, the ids are given in the order the stations appear
         line = f.readline()
         while line.find("oameni") == -1:
             aux = line.strip().split("lei")[0]
@@ -1313,7 +2681,8 @@ def transformInput(file):
             tplec = float(aux.split("min")[0])
             travelTime = float(aux.split("min")[1])
             aux = aux.split("min")[2][1:].split(",")
-            busSchemas.append(BusSchema(busNr, ticketPrice, tplec, travelTime, aux))
+            route = [stationIds.setdefault(station, len(stationIds)) for station in aux]
+            busSchemas.append(BusSchema(busNr, ticketPrice, tplec, travelTime, route))
             line = f.readline()
         nrPeople = int(line.split(" oameni")[0])
         while nrPeople > 0:
@@ -1322,19 +2691,22 @@ def transformInput(file):
             name = aux.split(" ")[0]
             budget = float(aux.split(" ")[1])
             aux = line.strip().split("lei ")[1].split(",")
-            persons.append(Person(name, budget, aux))
+            destinations = [stationIds.setdefault(station, len(stationIds)) for station in aux]
+            persons.append(Person(name, budget, destinations))
             nrPeople -= 1
-        nodInfo = Information(busSchemas, persons, [], 0)
+        # The schemas are sorted only once, all the states share the list
+        busSchemas.sort(key=lambda x: (x.ticketPrice, x.travelTime, x.tplec))
+        nodInfo = Information(busSchemas, persons, [], 0, stations=list(stationIds.keys()))
         if not nodInfo.checkIfPossible():
             return "Doua persoane in aceeasi statie"
         nodStart = Node(nodInfo, None, 0, 0, 0, 0, startTime)
         if nodStart.isFinal():
             return "Stare intiala este si finala."
         minMoney = min([person.budget for person in persons])
-        if minMoney < nodInfo.minimumTicketPrice:
+        if minMoney < busSchemas[0].ticketPrice:
             return "Nu exista solutie."
         graf = Graph(startTime, endTime, nodStart)
-        if nodInfo.minimumTravelTime > graf.duration:
+        if graf.minimumTravelTime > graf.duration:
             return "Nu exista solutie"
         return graf
     except:
@@ -1343,39 +2715,490 @@ def transformInput(file):
 
 
 def initialize():
-    if len(sys.argv) != 5:
+    arguments = sys.argv[1:]
+    # Optional arguments, given as --name value
+    options = {"jobs": 1, "backend": "thread", "memory-limit": 0, "records": "none", "weight": Graph.aStarWeight,
+               "beam-width": Graph.beamWidth, "node-budget": Graph.smaNodeBudget, "profile": "",
+               "instrument": "", "dominance": "off", "table-size": Graph.transpositionTableSize}
+
+    index = 0
+    while index < len(arguments):
+        if arguments[index].startswith("--"):
+            name = arguments[index][2:]
+            if name not in options or index + 1 == len(arguments):
+                print(f"Invalid option {arguments[index]}")
+                sys.exit(1)
+            try:
+                options[name] = type(options[name])(arguments[index + 1])
+            except:
+                print(f"Invalid value for option {arguments[index]}")
+                sys.exit(1)
+            del arguments[index:index + 2]
+        else:
+            index += 1
+
+    if len(arguments) != 4:
         print("Invalid number of arguments given. ")
         sys.exit(1)
     else:
         try:
-            inputDirectory = sys.argv[1]
-            outputDirectory = sys.argv[2]
-            nsol = int(sys.argv[3])
-            timeout = int(sys.argv[4])
+            inputDirectory = arguments[0]
+            outputDirectory = arguments[1]
+            nsol = int(arguments[2])
+            timeout = int(arguments[3])
         except:
             print("Something went wrong.")
             sys.exit(1)
-    return inputDirectory, outputDirectory, nsol, timeout
+    if options["jobs"] < 1:
+        print("The number of jobs should be at least 1")
+        sys.exit(1)
+    if options["backend"] not in ("thread", "process"):
+        print("The backend should be thread or process")
+        sys.exit(1)
+    if options["memory-limit"] < 0:
+        print("The memory limit should be a positive number of MB, or 0 for no limit")
+        sys.exit(1)
+    if options["records"] not in ("none", "jsonl", "binary"):
+        print("The records should be none, jsonl or binary")
+        sys.exit(1)
+    if options["weight"] < 1:
+        print("The weight should be at least 1")
+        sys.exit(1)
+    if options["beam-width"] < 1:
+        print("The beam width should be at least 1")
+        sys.exit(1)
+    if options["node-budget"] < 2:
+        print("The node budget should be at least 2")
+        sys.exit(1)
+    if options["dominance"] not in ("on", "off"):
+        print("The dominance pruning should be on or off")
+        sys.exit(1)
+    if options["table-size"] < 0:
+        print("The transposition table size should be at least 0")
+        sys.exit(1)
+    return inputDirectory, outputDirectory, nsol, timeout, options
+
+
+class Instrumentation:
+    """Timers and counters of the phases of one search, how long genereazaSuccesori, calculeaza_h, the duplicate
+    checks and pathString take, how many objects are copied, how many successors an expansion has and how many time
+    steps it simulates
+
+    Note:
+        The measurements are made in the code of the searches, only when the graph has an instrumentation, so a search
+        that isn't instrumented only checks gr.instrumentation. Nothing is replaced, so searches on other graphs can
+        run at the same time. genereazaSuccesori is the simulation of the time steps, without calculeaza_h. The
+        duplicate checks are the checks of the path for cycles, the dominance checks and the lookups in the open and
+        closed lists of a_star_optimizat (and weighted_a_star). The copies are the states, persons and buses copied
+        by the simulation. The branching factor and the time steps are counted only for the expansions whose
+        successors were all generated. The statistics of a solution are taken when it is found, before its path is
+        formatted, so they don't have the time of pathString, only the measurements of the whole search do
+    """
+
+    def __init__(self):
+        self.times = {"genereazaSuccesori": 0.0, "calculeaza_h": 0.0, "duplicateChecks": 0.0, "pathString": 0.0}
+        self.copies = 0
+        self.distributions = {"branching": Counter(), "timeSteps": Counter()}
+        self.graph = None
+
+    def attach(self, graph):
+        """Starts measuring the searches on the graph
+
+        :param graph: Graph
+        """
+        self.graph = graph
+        graph.instrumentation = self
+
+    def detach(self):
+        """Stops measuring the searches on the graph"""
+        self.graph.instrumentation = None
+
+    def start(self):
+        """Starts timing a phase
+
+        :return: the time it started, for stop
+        """
+        return time.perf_counter()
+
+    def stop(self, name, started):
+        """Adds the time since start to a phase
+
+        :param name: name of the phase, a key of times
+        :param started: what start returned
+        """
+        self.times[name] += time.perf_counter() - started
+
+    def snapshot(self):
+        """The measurements until now, as data
+
+        :return: dict
+        """
+        result = {"times": dict(self.times), "copies": self.copies}
+        for name, distribution in self.distributions.items():
+            total = sum(distribution.values())
+            result[name] = {"mean": sum(value * count for value, count in distribution.items()) / total
+                            if total > 0 else 0, "distribution": {str(value): distribution[value]
+                                                                  for value in sorted(distribution)}}
+        return result
 
 
-def solve():
-    inputDirectory, outputDirectory, nsol, timeout = initialize()
+def runAlgorithm(function, graph, nsol, heuristic, timeout, output, instrumentation=None):
+    """Runs one search algorithm with one heuristic, passing on every solution as soon as it is found
+
+    Note:
+        The search functions are generators, so the solutions found before a timeout are not lost. Only the search
+        runs under the timeout, output is called outside it, so a timeout never stops a solution half written
+
+    :param function: search function, from functionList
+    :param graph: Graph
+    :param nsol: number of solutions wanted (a_star_optimizat, weighted_a_star and sma_star always return one,
+     anytime_a_star returns every better solution it finds)
+    :param heuristic: type of heuristic
+    :param timeout: time in seconds after which the search is stopped, 0 for no timeout
+    :param output: function called with every Solution
+    :param instrumentation: Instrumentation measuring the search or None
+    :return: dict with the reason the search stopped before finding all the solutions in "stopped", or None
+    """
+    # The cached heuristic values are kept for the next runs on the same graph, only the counters start again
+    graph.heuristicHits = 0
+    graph.heuristicMisses = 0
+    if function.__name__ in ("a_star_optimizat", "weighted_a_star", "anytime_a_star", "sma_star"):
+        arguments = (graph, heuristic)
+    else:
+        arguments = (graph, nsol, heuristic)
+    if instrumentation is not None:
+        instrumentation.attach(graph)
+    try:
+        if timeout == 0:
+            for solution in function(*arguments):
+                output(solution)
+            return None
+        import stopit  # Only needed for the timeout, and slow to import
+        deadline = time.time() + timeout
+        solutions = function(*arguments)
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return {"stopped": "timeout"}
+            with stopit.ThreadingTimeout(remaining) as timer:
+                solution = next(solutions, None)
+            if timer.state == timer.TIMED_OUT:
+                return {"stopped": "timeout"}
+            if solution is None:
+                return None
+            output(solution)
+    finally:
+        if instrumentation is not None:
+            instrumentation.detach()
+
+
+class SolutionWriter:
+    """Writes the result of one (algorithm, heuristic) cell in the output file, one solution at a time
+
+    Note:
+        The file is flushed after every solution, so the solutions found are in the file even if the search is
+        stopped or the program is killed afterwards
+    """
+    def __init__(self, f):
+        """
+        :param f: output file, opened with buffering
+        """
+        self.f = f
+        self.nrSolutions = 0
+
+    def write(self, solution):
+        """
+        :param solution: Solution
+        """
+        if self.nrSolutions > 0:
+            self.f.write('-\n'.rjust(50, '-'))
+        self.f.write(str(solution))
+        self.f.flush()
+        self.nrSolutions += 1
+
+    def stop(self, reason):
+        """Writes why the search stopped before finding all the solutions, with the statistics gathered until then
+
+        :param reason: dict, the reason in "stopped" and, for a worker process, the statistics (stoppedReason)
+        """
+        if self.nrSolutions > 0:
+            self.f.write('-\n'.rjust(50, '-'))
+        listString = [f"Stopped because of {reason['stopped']}\n"]
+        for label, name in [("Numarul maxim de noduri in memorie", "maxNodesMemory"),
+                            ("Numarul total de noduri calculate", "nodesCalculated"),
+                            ("Numarul de noduri expandate", "nodesExpanded")]:
+            if name in reason:
+                listString.append(f"{label}: {str(reason[name])}\n")
+        self.f.write("".join(listString))
+        self.f.flush()
+
+
+class RecordWriter:
+    """Writes the solutions of the (algorithm, heuristic) cells of one input as records, one for every solution
+
+    Note:
+        In JSON Lines every record is a line. In the binary encoding every record is its compact JSON compressed with
+        zlib, preceded by the length of the compressed bytes (4 bytes, big endian). Both can be read with readRecords
+    """
+    def __init__(self, f, binary, **cell):
+        """
+        :param f: output file, opened in binary mode for the binary encoding
+        :param binary: True for the binary encoding, False for JSON Lines
+        :param cell: fields added to every record (input, algorithm, heuristic)
+        """
+        self.f = f
+        self.binary = binary
+        self.cell = cell
+        self.nrSolutions = 0
+
+    def writeRecord(self, record):
+        """
+        :param record: dict, the fields of the cell are added to it
+        """
+        import json  # The modules of the records are only imported when records are written
+        record = dict(self.cell, **record)
+        if self.binary:
+            import struct
+            import zlib
+            data = zlib.compress(json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            self.f.write(struct.pack(">I", len(data)) + data)  # The length is never written without its record
+        else:
+            self.f.write(json.dumps(record, ensure_ascii=False))
+            self.f.write("\n")
+        self.f.flush()
+
+    def write(self, solution):
+        """
+        :param solution: Solution or its record
+        """
+        self.nrSolutions += 1
+        record = solution.record() if isinstance(solution, Solution) else solution
+        self.writeRecord(dict({"solution": self.nrSolutions}, **record))
+
+    def stop(self, reason):
+        """Writes a record with the reason the search stopped before finding all the solutions
+
+        :param reason: dict, the reason in "stopped" and, for a worker process, the statistics (stoppedReason)
+        """
+        self.writeRecord(reason)
+
+
+def readRecords(f, binary):
+    """Reads the records written by RecordWriter
+
+    :param f: file opened in binary mode for the binary encoding
+    :param binary: True for the binary encoding, False for JSON Lines
+    :return: generator of dict
+    """
+    import json
+    if not binary:
+        for line in f:
+            yield json.loads(line)
+        return
+    import struct
+    import zlib
+    while True:
+        size = f.read(4)
+        if len(size) < 4:
+            return
+        yield json.loads(zlib.decompress(f.read(struct.unpack(">I", size)[0])).decode("utf-8"))
+
+
+def stoppedReason(reason, progress):
+    """Builds the reason a cell whose worker process didn't finish stopped, with the statistics gathered until then
+
+    :param reason: why the search stopped, "timeout", "memory limit" or "an error"
+    :param progress: shared array [max nodes in memory, nodes calculated, nodes expanded]
+    :return: dict with the reason in "stopped", maxNodesMemory, nodesCalculated and nodesExpanded
+    """
+    return {"stopped": reason, "maxNodesMemory": int(progress[0]), "nodesCalculated": int(progress[1]),
+            "nodesExpanded": int(progress[2])}
+
+
+def runCell(connection, progress, memoryLimit, records, instrument, settings, inputPath, functionName, heuristic,
+            nsol):
+    """Runs one (input, algorithm, heuristic) cell in a worker process and sends the solutions back as they are found
+
+    Note:
+        Every solution is sent formatted, in a ("solution", (string, record or None)) message, the last message is
+        ("end", (reason the search stopped or None, snapshot of the instrumentation or None)), the reason is a dict
+        like the one of runAlgorithm
+
+    :param connection: the sending end of a Pipe
+    :param progress: shared array in which the search writes its statistics
+    :param memoryLimit: maximum address space of the process in MB, 0 for no limit
+    :param records: True if the records of the solutions are needed too
+    :param settings: dict attribute name -> value, set on Graph before solving
+    :param inputPath: path of the input file
+    :param functionName: name of the search function
+    :param heuristic: type of heuristic
+    :param nsol: number of solutions wanted
+    """
+    if memoryLimit != 0:
+        try:
+            import resource  # Only available on Unix
+            resource.setrlimit(resource.RLIMIT_AS, (memoryLimit * 1024 * 1024, memoryLimit * 1024 * 1024))
+        except (ImportError, ValueError, OSError):
+            print("The memory limit can't be set on this system, running without it")
+    for name, value in settings.items():
+        setattr(Graph, name, value)
+    graph = transformInput(inputPath)
+    graph.progress = progress
+    instrumentation = Instrumentation() if instrument else None
+    stopped = False
+    try:
+        reason = runAlgorithm(globals()[functionName], graph, nsol, heuristic, 0,
+                              lambda solution: connection.send(("solution", (str(solution),
+                                                                             solution.record() if records else None))),
+                              instrumentation)
+    except MemoryError:
+        stopped = True  # The search tree is released here, so there's memory again for the message
+    if stopped:
+        reason = stoppedReason("memory limit", progress)
+    connection.send(("end", (reason, instrumentation.snapshot() if instrument else None)))
+    connection.close()
+
+
+def stopProcess(process):
+    """Stops a worker process, giving it a second to exit on SIGTERM before killing it
+
+    :param process: multiprocessing.Process
+    """
+    process.terminate()
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+
+
+def runCellsParallel(cells, jobs, timeout, memoryLimit=0, records=False, settings=None, instrument=False):
+    """Runs the cells in at most jobs worker processes at a time
+
+    Note:
+        Every cell has its own process, so the timeout of a cell is enforced by killing its process. The solutions
+        are received as they are found, so the ones found before the process was killed are kept. The statistics of
+        a killed search are read from an array shared with its process. A cell is given as soon as it and the cells
+        before it have finished, so only the cells that finished before their turn are kept in memory
+
+    :param cells: list of tuples (inputPath, functionName, heuristic, nsol)
+    :param jobs: number of processes running at the same time
+    :param timeout: time in seconds after which a cell is stopped, 0 for no timeout
+    :param memoryLimit: maximum address space of every process in MB, 0 for no limit
+    :param records: True if the records of the solutions are needed too
+    :param settings: dict attribute name -> value, set on Graph in every worker process
+    :param instrument: True if the searches are run with Instrumentation
+    :return: generator of tuples (list of (solution string, record or None), reason the search stopped (dict, see
+     stoppedReason) or None, snapshot of the instrumentation or None), one for every cell, in the same order as cells. A killed search has no
+     snapshot
+    """
+    import multiprocessing  # Only needed for worker processes
+    import multiprocessing.connection
+    results = {}  # Cell index -> result, for the cells finished and not given yet
+    nextResult = 0
+    running = {}  # Receiving end of the pipe -> (cell index, process, deadline, progress, solutions received)
+    nextCell = 0
+    while nextCell < len(cells) or len(running) > 0:
+        while nextCell < len(cells) and len(running) < jobs:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            progress = multiprocessing.Array("d", 3, lock=False)
+            process = multiprocessing.Process(target=runCell,
+                                              args=(sender, progress, memoryLimit, records, instrument,
+                                                    settings or {}) + tuple(cells[nextCell]))
+            process.start()
+            sender.close()  # Only the worker writes, so the receiver gets EOF if the worker dies
+            running[receiver] = (nextCell, process, time.time() + timeout if timeout != 0 else None, progress, [])
+            nextCell += 1
+
+        deadlines = [deadline for _, _, deadline, _, _ in running.values() if deadline is not None]
+        waitTime = max(0, min(deadlines) - time.time()) if len(deadlines) > 0 else None
+        ready = multiprocessing.connection.wait(list(running.keys()), timeout=waitTime)
+
+        now = time.time()
+        for receiver in list(running.keys()):
+            index, process, deadline, progress, solutions = running[receiver]
+            finished = False
+            waiting = receiver in ready
+            try:
+                while not finished and (waiting or receiver.poll()):
+                    waiting = False  # Only the first recv relies on wait, the next ones check with poll
+                    kind, content = receiver.recv()
+                    if kind == "solution":
+                        solutions.append(content)
+                    else:
+                        results[index] = (solutions,) + content
+                        finished = True
+            except EOFError:
+                # The worker ended without sending the end of the search
+                results[index] = (solutions, stoppedReason("an error", progress), None)
+                finished = True
+            if not finished:
+                if deadline is None or deadline > now:
+                    continue
+                stopProcess(process)
+                results[index] = (solutions, stoppedReason("timeout", progress), None)
+            del running[receiver]
+            receiver.close()
+            process.join()
+
+        while nextResult in results:
+            yield results.pop(nextResult)
+            nextResult += 1
+
+
+def solve(inputDirectory, outputDirectory, nsol, timeout, options):
+    """Solves every input with every algorithm and heuristic and writes the output files
+
+    :param inputDirectory: directory with the input files
+    :param outputDirectory: directory of the output files, created if it doesn't exist
+    :param nsol: number of solutions wanted
+    :param timeout: time in seconds after which a search is stopped, 0 for no timeout
+    :param options: the optional arguments, from initialize
+    """
     try:
         inputList = os.listdir(inputDirectory)
     except:
         print("Invalid input path")
         sys.exit(1)
-    functionList = [breadth_first, depth_first, depth_first_iterativ, a_star, a_star_optimizat, ida_star]
+    functionList = [breadth_first, depth_first, depth_first_iterativ, a_star, a_star_optimizat, ida_star,
+                    weighted_a_star, beam_search, anytime_a_star, sma_star]
     heuristicList = ["euristica banala", "euristica admisibila 1", "euristica admisibila 2", "euristica admisibila 3", \
-                     "euristica neadmisibila"]
+                     "euristica admisibila 4", "euristica neadmisibila"]
     if not os.path.exists(outputDirectory):
         os.mkdir(outputDirectory)
-    for inputName in inputList:
-        maybeGraph = transformInput(f"{inputDirectory}/{inputName}")
+
+    settings = {"aStarWeight": options["weight"], "beamWidth": options["beam-width"],
+                "smaNodeBudget": options["node-budget"], "dominancePruning": options["dominance"] == "on",
+                "transpositionTableSize": options["table-size"]}
+    for name, value in settings.items():
+        setattr(Graph, name, value)
+
+    graphs = [(inputName, transformInput(f"{inputDirectory}/{inputName}")) for inputName in inputList]
+    # Running in worker processes is needed for more jobs or for the memory limit
+    useProcesses = options["jobs"] > 1 or options["backend"] == "process" or options["memory-limit"] != 0
+    if useProcesses:
+        # The cells are written in the same order as without processes, each one as soon as it and the cells
+        # before it are solved
+        cells = [(f"{inputDirectory}/{inputName}", function.__name__, heuristic, nsol)
+                 for inputName, maybeGraph in graphs if not isinstance(maybeGraph, str)
+                 for function in functionList for heuristic in heuristicList]
+        results = runCellsParallel(cells, options["jobs"], timeout, options["memory-limit"],
+                                   options["records"] != "none", settings, options["instrument"] != "")
+
+    measurements = []  # Snapshots of the instrumentation, exported as JSON at the end
+    for inputName, maybeGraph in graphs:
+        # The records are written alongside the text output, in their own file
+        recordFile = None
+        if options["records"] == "jsonl":
+            recordFile = open(f"{outputDirectory}/{inputName}_output.jsonl", "w", encoding="utf-8")
+        elif options["records"] == "binary":
+            recordFile = open(f"{outputDirectory}/{inputName}_output.bin", "wb")
         if maybeGraph.__class__.__name__ == "str":
             f = open(f"{outputDirectory}/{inputName}_output", "w")
             f.write(maybeGraph)
             f.close()
+            if recordFile is not None:
+                RecordWriter(recordFile, options["records"] == "binary", input=inputName).writeRecord(
+                    {"error": maybeGraph})
+                recordFile.close()
             continue
         f = open(f"{outputDirectory}/{inputName}_output", "w")
         for function in functionList:
@@ -1386,26 +3209,55 @@ def solve():
             for heuristic in heuristicList:
                 f.write(f"\n\nEuristica folosita: {heuristic}\n")
                 f.write('_\n'.rjust(50, '_'))
-                if function.__name__ == "a_star_optimizat":
-                    if timeout != 0:
-                        solutions = function(maybeGraph, heuristic, timeout=timeout)
-                    else:
-                        solutions = function(maybeGraph, heuristic)
-                else:
-                    if timeout != 0:
-                        solutions = function(maybeGraph, nsol, heuristic, timeout=timeout)
-                    else:
-                        solutions = function(maybeGraph, nsol, heuristic)
-                if solutions == "Stopped because of timeout":
-                    f.write(solutions)
-                    f.write('\n')
+                writers = [SolutionWriter(f)]
+                if recordFile is not None:
+                    writers.append(RecordWriter(recordFile, options["records"] == "binary", input=inputName,
+                                                algorithm=function.__name__, heuristic=heuristic))
+                if useProcesses:
+                    solutions, reason, snapshot = next(results)
+                    for parts in solutions:  # The string and the record of the solution
+                        for writer, part in zip(writers, parts):
+                            writer.write(part)
                 else:
-                    for solution in solutions:
-                        f.write(solution)
-                        if solution != solutions[-1]:
-                            f.write('-\n'.rjust(50, '-'))
+                    def output(solution):
+                        for writer in writers:
+                            writer.write(solution)
+                    instrumentation = Instrumentation() if options["instrument"] != "" else None
+                    reason = runAlgorithm(function, maybeGraph, nsol, heuristic, timeout, output, instrumentation)
+                    snapshot = instrumentation.snapshot() if instrumentation is not None else None
+                if snapshot is not None:
+                    measurements.append(dict(input=inputName, algorithm=function.__name__, heuristic=heuristic,
+                                             stopped=reason["stopped"] if reason is not None else None,
+                                             **snapshot))
+                if reason is not None:
+                    for writer in writers:
+                        writer.stop(reason)
         f.close()
+        if recordFile is not None:
+            recordFile.close()
+    if options["instrument"] != "":
+        import json  # Only needed for the export
+        with open(options["instrument"], "w", encoding="utf-8") as f:
+            json.dump(measurements, f, indent=1)
+
+
+def main():
+    """Entry point of the command line, runs solve under cProfile only when --profile is given"""
+    arguments = initialize()
+    profilePath = arguments[4]["profile"]
+    if profilePath == "":
+        solve(*arguments)
+        return
+    import cProfile  # Only needed for profiling
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        solve(*arguments)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profilePath)
+        print(f"Profile written in {profilePath}")
 
 
 if __name__ == "__main__":
-    cProfile.run("solve()")
+    main()
@@ -0,0 +1,26 @@
+import os
+
+from multeautobuze import anytime_a_star, runAlgorithm, transformInput, weighted_a_star
+
+INPUT = os.path.join(os.path.dirname(__file__), os.pardir, "folder_input", "input4")
+
+
+def bounds(function, heuristic):
+    solutions = []
+    runAlgorithm(function, transformInput(INPUT), 1, heuristic, 0, solutions.append)
+    assert len(solutions) > 0
+    return [solution.stats["suboptimalityBound"] for solution in solutions]
+
+
+def test_weighted_a_star_bound():
+    graph = transformInput(INPUT)
+    assert bounds(weighted_a_star, "euristica admisibila 4") == [graph.aStarWeight]
+    # These heuristics can overestimate, so the weight doesn't bound the cost
+    for heuristic in ["euristica banala", "euristica admisibila 3", "euristica neadmisibila"]:
+        assert bounds(weighted_a_star, heuristic) == [None]
+
+
+def test_anytime_a_star_bound():
+    assert all(bound is not None for bound in bounds(anytime_a_star, "euristica admisibila 4"))
+    for heuristic in ["euristica banala", "euristica admisibila 3"]:
+        assert all(bound is None for bound in bounds(anytime_a_star, heuristic))
@@ -0,0 +1,52 @@
+from multeautobuze import BusSchema, Timetable
+
+
+def makeBusSchemas():
+    # Stations 0, 1, 2 on bus 100 and 3, 1, 4 on bus 200, both go through station 1
+    return [BusSchema(100, 5, 15, 4, [0, 1, 2]), BusSchema(200, 10, 12, 7, [3, 1, 4])]
+
+
+def makeTimetable():
+    return Timetable(makeBusSchemas(), 30)
+
+
+def bruteForceStation(busSchemas, station):
+    """Every (time, bus) in the station, found by going through all the buses"""
+    visits = []
+    for schemaIndex, busSchema in enumerate(busSchemas):
+        for leaveTime in range(0, 31, busSchema.tplec):
+            for typeIndex, (type, route) in enumerate([("normal", busSchema.route),
+                                                       ("reverse", busSchema.reverseRoute)]):
+                for routeIndex, routeStation in enumerate(route):
+                    if routeStation == station:
+                        visits.append((leaveTime + routeIndex * busSchema.travelTime, leaveTime, schemaIndex,
+                                       typeIndex, (busSchema.nr, leaveTime, type, routeIndex)))
+    return [(visit[0], visit[-1]) for visit in sorted(visits)]
+
+
+def test_busesAt():
+    timetable = makeTimetable()
+    assert timetable.busesAt(1, 19) == [(200, 12, "normal", 1), (200, 12, "reverse", 1),
+                                        (100, 15, "normal", 1), (100, 15, "reverse", 1)]
+    assert timetable.busesAt(0, 8) == [(100, 0, "reverse", 2)]
+    assert timetable.busesAt(1, 5) == []
+    assert timetable.busesAt(99, 0) == []
+
+
+def test_nextArrival():
+    timetable = makeTimetable()
+    assert timetable.nextArrival(0, 0) == (8, (100, 0, "reverse", 2))
+    assert timetable.nextArrival(1, 19) == (31, (200, 24, "normal", 1))
+    assert timetable.nextArrival(1, 34) is None
+    assert timetable.nextArrival(99, 0) is None
+
+
+def test_stationQueriesMatchAllBuses():
+    busSchemas = makeBusSchemas()
+    timetable = Timetable(busSchemas, 30)
+    for station in range(5):
+        visits = bruteForceStation(busSchemas, station)
+        for time in range(-1, 45):
+            assert timetable.busesAt(station, time) == [bus for visitTime, bus in visits if visitTime == time]
+            later = [visit for visit in visits if visit[0] > time]
+            assert timetable.nextArrival(station, time) == (later[0] if later else None)